@@ -18,5 +18,9 @@ hdfs dfs -put data/claims.csv /tmp/claims
 echo "-- Create kudu tables and initial data"
 impala-shell -f create_table.sql -B -o create_table.sql.log
 
+echo "-- Load the claims into kudu"
+source /opt/rh/rh-python36/enable
+python -u setup_model/claims_loader.py data/claims.csv data/customers.csv
+
 echo "-- Create kudu tables and initial data completely"
 
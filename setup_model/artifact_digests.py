@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Local record of the artifacts already uploaded to each CDSW project.
+
+The manifest maps ``<cluster api>`` -> ``<project>/<file>`` -> SHA-256 digest
+and size of the last successful upload, so unchanged artifacts are not sent
+again on a redeploy.
+"""
+
+import hashlib
+import threading
+
+import local_state
+
+_HASH_BLOCK_SIZE = 1048576
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            buf = f.read(_HASH_BLOCK_SIZE)
+            if not buf:
+                break
+            digest.update(buf)
+    return digest.hexdigest()
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class DigestManifest(object):
+
+    def __init__(self, path=None):
+        self.path = path or local_state.state_path('artifacts.json')
+        self._lock = threading.Lock()
+        self._entries = local_state.read_json(self.path, {})
+
+    def get(self, cluster, key):
+        with self._lock:
+            return self._entries.get(cluster, {}).get(key)
+
+    def unchanged(self, cluster, key, digest):
+        entry = self.get(cluster, key)
+        return bool(entry) and entry['sha256'] == digest
+
+    def record(self, cluster, key, digest, size):
+        with self._lock:
+            self._entries.setdefault(cluster, {})[key] = {'sha256': digest, 'size': size}
+            local_state.write_json(self.path, self._entries)
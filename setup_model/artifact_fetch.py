@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Concurrent fetch of the model files into the resource directory.
+
+Instead of cloning each model repository, only the 'project_file' of every
+manifest entry is downloaded from its GitHub repository ('git_url'), all of
+them at once. A downloaded file must match the git blob id GitHub lists for it
+at the resolved commit; a Git LFS pointer is followed and its content must
+match the pointer's SHA-256 and size. An 'artifact_sha256' in the manifest
+entry pins the content further.
+
+Verified files are kept in a local cache versioned by commit,
+``<cache>/<owner>/<repo>/<commit>/<path>`` next to a ``.sha256`` file, so
+rebuilding an environment only downloads files of new commits. If GitHub
+cannot be reached, the most recent cached commit of the repository is used.
+
+    python artifact_fetch.py /tmp/resource
+    python artifact_fetch.py /tmp/resource --ref 3f2a9c1 --keep 2
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import cdsw_transport
+import local_state
+from model_manifest import MODELS
+
+GITHUB_API = 'https://api.github.com'
+GITHUB_RAW = 'https://raw.githubusercontent.com'
+GITHUB_MEDIA = 'https://media.githubusercontent.com/media'
+FETCH_WORKERS = 4
+KEEP_VERSIONS = 3
+_BLOCK_SIZE = 1048576
+_LFS_POINTER = b'version https://git-lfs.github.com/spec/v1'
+
+
+def cache_dir():
+    return os.environ.get('CDSW_ARTIFACT_CACHE', local_state.state_path('artifacts'))
+
+
+def _repository(git_url):
+    owner, repo = git_url.rstrip('/').split('/')[-2:]
+    return owner, repo[:-len('.git')] if repo.endswith('.git') else repo
+
+
+def _api_get(session, path):
+    return cdsw_transport.rest_call(session, 'GET', GITHUB_API + path).json()
+
+
+def resolve(session, owner, repo, ref):
+    """(commit sha, {path: (git blob sha, size)}) of ``ref`` in the repository."""
+    commit = _api_get(session, '/repos/{}/{}/commits/{}'.format(owner, repo, ref))
+    tree = _api_get(session, '/repos/{}/{}/git/trees/{}?recursive=1'.format(owner, repo, commit['commit']['tree']['sha']))
+    blobs = dict((e['path'], (e['sha'], e['size'])) for e in tree['tree'] if e['type'] == 'blob')
+    return commit['sha'], blobs
+
+
+def _download(session, url, path, hashers):
+    """Streams ``url`` to ``path``, feeding the hash objects of ``hashers``; returns the size."""
+    # Not through rest_call, which reads the whole body to record its size
+    size = 0
+    with session.get(url, stream=True, timeout=cdsw_transport.DEFAULT_TIMEOUT) as resp, open(path, 'wb') as f:
+        if resp.status_code != 200:
+            raise RuntimeError('GET {} returned {}'.format(url, resp.status_code))
+        for block in resp.iter_content(_BLOCK_SIZE):
+            for hasher in hashers:
+                hasher.update(block)
+            f.write(block)
+            size += len(block)
+    return size
+
+
+def _lfs_pointer(path):
+    with open(path, 'rb') as f:
+        head = f.read(1024)
+    if not head.startswith(_LFS_POINTER):
+        return None
+    fields = dict(line.split(b' ', 1) for line in head.splitlines() if b' ' in line)
+    return fields[b'oid'].decode('ascii').split(':', 1)[1], int(fields[b'size'])
+
+
+def _fetch_verified(session, owner, repo, commit, path, blob, target):
+    """Downloads ``path`` at ``commit`` to ``target``, checked against the git blob; returns its SHA-256."""
+    blob_sha, blob_size = blob
+    git_hash = hashlib.sha1('blob {}\0'.format(blob_size).encode('ascii'))
+    content_hash = hashlib.sha256()
+    _download(session, '{}/{}/{}/{}/{}'.format(GITHUB_RAW, owner, repo, commit, path), target,
+              [git_hash, content_hash])
+    if git_hash.hexdigest() != blob_sha:
+        raise RuntimeError('{}/{}@{}:{} does not match its git blob {}'.format(owner, repo, commit, path, blob_sha))
+    pointer = _lfs_pointer(target)
+    if pointer:
+        oid, size = pointer
+        content_hash = hashlib.sha256()
+        actual_size = _download(session, '{}/{}/{}/{}/{}'.format(GITHUB_MEDIA, owner, repo, commit, path), target,
+                                [content_hash])
+        if content_hash.hexdigest() != oid or actual_size != size:
+            raise RuntimeError('{}/{}@{}:{} does not match its LFS object {}'.format(owner, repo, commit, path, oid))
+    return content_hash.hexdigest()
+
+
+def _latest_cached_commit(owner, repo):
+    directory = os.path.join(cache_dir(), owner, repo)
+    if not os.path.isdir(directory):
+        return None
+    versions = sorted(os.listdir(directory), key=lambda v: os.path.getmtime(os.path.join(directory, v)))
+    return versions[-1] if versions else None
+
+
+def _copy_verified(source, digest, target):
+    """Copies the cached ``source`` to ``target``, checking it still has SHA-256 ``digest``."""
+    content_hash = hashlib.sha256()
+    tmp_target = target + '.part'
+    with open(source, 'rb') as src, open(tmp_target, 'wb') as dst:
+        while True:
+            block = src.read(_BLOCK_SIZE)
+            if not block:
+                break
+            content_hash.update(block)
+            dst.write(block)
+    if content_hash.hexdigest() != digest:
+        os.remove(tmp_target)
+        return False
+    os.replace(tmp_target, target)
+    return True
+
+
+def fetch(session, spec, dest_dir, ref='main'):
+    """Puts the model file of ``spec`` in ``dest_dir``; returns (commit, SHA-256, whether it was downloaded)."""
+    owner, repo = _repository(spec['git_url'])
+    path = spec['project_file']
+    try:
+        commit, blobs = resolve(session, owner, repo, ref)
+    except (requests.exceptions.RequestException, RuntimeError) as err:
+        commit, blobs = _latest_cached_commit(owner, repo), None
+        if not commit:
+            raise
+        print('[{}] Cannot resolve {} ({}). Using cached commit {}.'.format(spec['name'], ref, err, commit))
+
+    version_dir = os.path.join(cache_dir(), owner, repo, commit)
+    cached = os.path.join(version_dir, *path.split('/'))
+    target = os.path.join(dest_dir, spec['model_file'])
+    if os.path.exists(cached + '.sha256'):
+        with open(cached + '.sha256') as f:
+            digest = f.read().strip()
+        if _copy_verified(cached, digest, target):
+            os.utime(version_dir)
+            return commit, digest, False
+        print('[{}] Cached {} is corrupted. Downloading it again.'.format(spec['name'], cached))
+    if blobs is None:
+        raise RuntimeError('{} is not cached and GitHub cannot be reached'.format(path))
+    if path not in blobs:
+        raise RuntimeError('{} not found in {}/{}@{}'.format(path, owner, repo, commit))
+
+    if not os.path.isdir(os.path.dirname(cached)):
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cached), prefix='.fetch-')
+    os.close(fd)
+    try:
+        digest = _fetch_verified(session, owner, repo, commit, path, blobs[path], tmp_path)
+        if spec.get('artifact_sha256') and spec['artifact_sha256'] != digest:
+            raise RuntimeError('{} has SHA-256 {}, the manifest pins {}'.format(path, digest, spec['artifact_sha256']))
+        os.replace(tmp_path, cached)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    with open(cached + '.sha256', 'w') as f:
+        f.write(digest + '\n')
+    _copy_verified(cached, digest, target)
+    return commit, digest, True
+
+
+def prune(keep=KEEP_VERSIONS):
+    """Keeps the ``keep`` (at least 1) most recently used commits of every cached repository.
+
+    The most recent one is the commit just fetched, which the next run at the same ref reuses.
+    """
+    keep = max(keep, 1)
+    root = cache_dir()
+    for owner in os.listdir(root) if os.path.isdir(root) else []:
+        for repo in os.listdir(os.path.join(root, owner)):
+            directory = os.path.join(root, owner, repo)
+            versions = sorted(os.listdir(directory), key=lambda v: os.path.getmtime(os.path.join(directory, v)))
+            for version in versions[:-keep]:
+                shutil.rmtree(os.path.join(directory, version), ignore_errors=True)
+
+
+def fetch_all(models, dest_dir, ref='main', workers=FETCH_WORKERS):
+    """Fetches the model files of ``models`` concurrently; returns the names of the failed ones."""
+    session = cdsw_transport.new_session()
+    session.headers['Accept'] = 'application/vnd.github+json'
+    if os.environ.get('GITHUB_TOKEN'):
+        session.headers['Authorization'] = 'token ' + os.environ['GITHUB_TOKEN']
+
+    def run(spec):
+        start = time.time()
+        commit, digest, downloaded = fetch(session, spec, dest_dir, ref)
+        print('[{}] {} @ {} sha256 {} ({}, {:.1f}s)'.format(spec['name'], spec['model_file'], commit[:12], digest[:12],
+                                                         'downloaded' if downloaded else 'cached',
+                                                         time.time() - start))
+
+    failures = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [(spec, executor.submit(run, spec)) for spec in models]
+        for spec, future in futures:
+            try:
+                future.result()
+            except Exception as err:
+                print('[{}] Fetch failed: {}'.format(spec['name'], err))
+                failures.append(spec['name'])
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fetch the model files of the manifest into a resource directory.')
+    parser.add_argument('resource_dir')
+    parser.add_argument('--ref', default='main', help='branch, tag or commit of the model repositories')
+    parser.add_argument('--workers', type=int, default=FETCH_WORKERS)
+    parser.add_argument('--keep', type=int, default=KEEP_VERSIONS, help='cached commits to keep per repository')
+    args = parser.parse_args()
+    if args.keep < 1:
+        parser.error('--keep must be at least 1')
+
+    if not os.path.isdir(args.resource_dir):
+        os.makedirs(args.resource_dir)
+    failures = fetch_all(MODELS, args.resource_dir, args.ref, args.workers)
+    prune(args.keep)
+    if failures:
+        raise RuntimeError('Fetch failed for: {}'.format(', '.join(failures)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Content-addressed store for the claim pictures.
+
+A picture is stored once, as raw bytes, under the SHA-256 of its content; the
+claims table only keeps the reference ``sha256:<hex digest>`` (see
+``create_table_image_refs.sql``). Storing the same photo again is a no-op.
+
+* ``LocalBlobStore`` keeps the blobs under a local directory, as
+  ``<root>/<2 hex>/<2 hex>/<digest>``;
+* ``HdfsBlobStore`` keeps them under an HDFS directory with the same layout,
+  through ``hdfs dfs`` like ``deploy_data.sh``. Every ``hdfs dfs`` call
+  starts a JVM, so new blobs are staged in a local directory and ``flush()``
+  sends them in one go: one ``-stat`` skips the blobs already in HDFS and one
+  ``-put`` copies the others.
+
+``open_store()`` picks one from a location (``hdfs://...`` or a local path).
+Call ``flush()`` before the references of the stored pictures are written.
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+
+REF_PREFIX = 'sha256:'
+
+
+def blob_ref(data):
+    return REF_PREFIX + hashlib.sha256(data).hexdigest()
+
+
+def _digest(ref):
+    if not ref.startswith(REF_PREFIX):
+        raise RuntimeError('Not a blob reference: {}'.format(ref))
+    return ref[len(REF_PREFIX):]
+
+
+def _relative_path(ref):
+    digest = _digest(ref)
+    return '{}/{}/{}'.format(digest[:2], digest[2:4], digest)
+
+
+class LocalBlobStore(object):
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, ref):
+        return os.path.join(self.root, *_relative_path(ref).split('/'))
+
+    def exists(self, ref):
+        return os.path.exists(self.path(ref))
+
+    def put(self, data):
+        """Stores ``data`` unless already there; returns its reference."""
+        ref = blob_ref(data)
+        path = self.path(ref)
+        if os.path.exists(path):
+            return ref
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.blob-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return ref
+
+    def flush(self):
+        pass
+
+    def get(self, ref):
+        with open(self.path(ref), 'rb') as f:
+            data = f.read()
+        if blob_ref(data) != ref:
+            raise RuntimeError('Corrupted blob {}'.format(ref))
+        return data
+
+
+class HdfsBlobStore(object):
+
+    def __init__(self, root, hdfs='hdfs'):
+        self.root = root.rstrip('/')
+        self.hdfs = hdfs
+        self._staged = {}
+        self._stored = set()
+        self._staging_dir = None
+
+    def path(self, ref):
+        return '{}/{}'.format(self.root, _relative_path(ref))
+
+    def exists(self, ref):
+        return ref in self._stored or subprocess.call([self.hdfs, 'dfs', '-test', '-e', self.path(ref)]) == 0
+
+    def put(self, data):
+        """Stages ``data`` for the next ``flush()``; returns its reference."""
+        ref = blob_ref(data)
+        if ref in self._stored or ref in self._staged:
+            return ref
+        if self._staging_dir is None:
+            self._staging_dir = tempfile.mkdtemp(prefix='blobs-')
+        path = os.path.join(self._staging_dir, *_relative_path(ref).split('/'))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(data)
+        self._staged[ref] = path
+        return ref
+
+    def _existing(self, refs):
+        """The blobs of ``refs`` already in HDFS."""
+        # -stat prints the name of every path that exists and fails on the others
+        process = subprocess.Popen([self.hdfs, 'dfs', '-stat', '%n'] + [self.path(ref) for ref in refs],
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        names = set(process.communicate()[0].decode('utf-8').split())
+        return set(ref for ref in refs if _digest(ref) in names)
+
+    def flush(self):
+        """Copies the staged blobs to HDFS."""
+        if not self._staged:
+            return
+        try:
+            missing = set(self._staged) - self._existing(list(self._staged))
+            for ref in set(self._staged) - missing:
+                os.remove(self._staged[ref])
+            if missing:
+                subprocess.check_call([self.hdfs, 'dfs', '-mkdir', '-p', self.root])
+                # The staging directory has the layout of the store: its top directories merge into the root.
+                # -f: a concurrent writer of the same content may have won the race, with the same bytes
+                tops = sorted(set(_relative_path(ref).split('/')[0] for ref in missing))
+                subprocess.check_call([self.hdfs, 'dfs', '-put', '-f']
+                                      + [os.path.join(self._staging_dir, top) for top in tops] + [self.root])
+            self._stored.update(self._staged)
+        finally:
+            shutil.rmtree(self._staging_dir, ignore_errors=True)
+            self._staging_dir = None
+            self._staged = {}
+
+    def get(self, ref):
+        data = subprocess.check_output([self.hdfs, 'dfs', '-cat', self.path(ref)])
+        if blob_ref(data) != ref:
+            raise RuntimeError('Corrupted blob {}'.format(ref))
+        return data
+
+
+def open_store(location):
+    if location.startswith('hdfs://'):
+        return HdfsBlobStore(location)
+    return LocalBlobStore(location)
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""asyncio client for the CDSW REST API.
+
+``AsyncCdsw`` exposes the same calls as ``cdsw_setup.Cdsw`` (get, post, put,
+patch, delete and the altus-ds-1 model helpers) as coroutines, so a single
+event loop can overlap many status checks and list calls across projects and
+clusters. It speaks HTTP/1.1 directly over asyncio streams with a keep-alive
+connection pool per host and follows the retry policy of ``cdsw_transport``.
+Multipart file uploads stay on the synchronous client (see ``cdsw_upload``).
+"""
+
+import asyncio
+import json as jsonlib
+import ssl
+from urllib.parse import urlsplit, urlencode
+
+import cdsw_transport
+import cdsw_setup
+import project_catalog
+
+
+class _StaleConnection(Exception):
+    pass
+
+
+class AsyncResponse(object):
+
+    def __init__(self, status_code, reason, headers, content):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return jsonlib.loads(self.text)
+
+    def __repr__(self):
+        return '<AsyncResponse [{}]>'.format(self.status_code)
+
+
+class _Connection(object):
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class _Pool(object):
+    """Idle keep-alive connections to one (scheme, host, port)."""
+
+    def __init__(self, host, port, ssl_context, size):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.idle = []
+        self.slots = asyncio.Semaphore(size)
+
+    async def acquire(self, timeout):
+        await self.slots.acquire()
+        while self.idle:
+            conn = self.idle.pop()
+            if not conn.reader.at_eof():
+                return conn, True
+            conn.close()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=self.ssl_context), timeout)
+        except BaseException:
+            self.slots.release()
+            raise
+        return _Connection(reader, writer), False
+
+    def release(self, conn, reusable):
+        if reusable:
+            self.idle.append(conn)
+        else:
+            conn.close()
+        self.slots.release()
+
+    def close(self):
+        for conn in self.idle:
+            conn.close()
+        self.idle = []
+
+
+async def _read_body(reader, headers, method, status):
+    if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+        return b''
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0].strip(), 16)
+            if size == 0:
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+    if 'content-length' in headers:
+        return await reader.readexactly(int(headers['content-length']))
+    return await reader.read()
+
+
+class AsyncCdsw(object):
+    """Coroutine counterpart of ``cdsw_setup.Cdsw`` for one CDSW cluster."""
+
+    def __init__(self, api, altus_api, token=None, verify=True, pool_size=cdsw_transport.POOL_SIZE,
+                 timeout=cdsw_transport.DEFAULT_TIMEOUT, model_service=None):
+        self.api = api
+        self.altus_api = altus_api
+        self.model_service = model_service
+        self.headers = {'Accept': 'application/json'}
+        if token:
+            self.headers['Authorization'] = 'Bearer ' + token
+        self.verify = verify
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pools = {}
+
+    @classmethod
+    def from_cdsw(cls, cdsw, **kwargs):
+        """Reuses the endpoints, trust settings and bearer token of an authorized ``Cdsw``."""
+        kwargs.setdefault('model_service', cdsw.model_service)
+        client = cls(cdsw.api, cdsw.altus_api, verify=cdsw.session.verify, **kwargs)
+        if 'Authorization' in cdsw.session.headers:
+            client.headers['Authorization'] = cdsw.session.headers['Authorization']
+        return client
+
+    def _ssl_context(self):
+        if self.verify is False:
+            return ssl._create_unverified_context()
+        if isinstance(self.verify, str):
+            return ssl.create_default_context(cafile=self.verify)
+        return ssl.create_default_context()
+
+    def _pool(self, scheme, host, port):
+        key = (scheme, host, port)
+        if key not in self._pools:
+            self._pools[key] = _Pool(host, port, self._ssl_context() if scheme == 'https' else None,
+                                     self.pool_size)
+        return self._pools[key]
+
+    async def _send(self, method, url, body, headers):
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        host_header = parts.hostname if parts.port is None else '{}:{}'.format(parts.hostname, parts.port)
+        lines = ['{} {} HTTP/1.1'.format(method, target), 'Host: {}'.format(host_header),
+                 'Content-Length: {}'.format(len(body))]
+        lines += ['{}: {}'.format(k, v) for k, v in headers.items()]
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+        pool = self._pool(parts.scheme, parts.hostname, port)
+        connect_timeout, read_timeout = self.timeout
+        conn, reused = await pool.acquire(connect_timeout)
+        reusable = False
+        status_line = b''
+        try:
+            conn.writer.write(request)
+            await conn.writer.drain()
+            status_line = await asyncio.wait_for(conn.reader.readline(), read_timeout)
+            if not status_line:
+                raise ConnectionResetError('Connection closed by {}'.format(parts.hostname))
+            version, status, reason = (status_line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+            resp_headers = {}
+            while True:
+                line = await asyncio.wait_for(conn.reader.readline(), read_timeout)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                resp_headers[name.strip().lower()] = value.strip()
+            content = await asyncio.wait_for(_read_body(conn.reader, resp_headers, method, int(status)),
+                                             read_timeout)
+            keep_alive = 'keep-alive' if version == 'HTTP/1.1' else 'close'
+            reusable = (resp_headers.get('connection', keep_alive).lower() == 'keep-alive'
+                        and ('content-length' in resp_headers
+                             or resp_headers.get('transfer-encoding', '').lower() == 'chunked'))
+            return AsyncResponse(int(status), reason, resp_headers, content)
+        except (ConnectionError, asyncio.IncompleteReadError) as err:
+            if reused and not status_line:
+                # The server closed the idle keep-alive connection before answering
+                raise _StaleConnection(err)
+            raise
+        finally:
+            pool.release(conn, reusable)
+
+    async def request(self, method, url, expected_codes=None, json=None, data=None, params=None, headers=None,
+                      idempotent=None, retries=cdsw_transport.RETRIES):
+        if not expected_codes:
+            expected_codes = [200]
+        if idempotent is None:
+            idempotent = method in cdsw_transport.IDEMPOTENT_METHODS
+        if not idempotent:
+            retries = 0
+        if params:
+            url += ('&' if '?' in url else '?') + urlencode(params)
+        all_headers = dict(self.headers)
+        if json is not None:
+            body = jsonlib.dumps(json).encode('utf-8')
+            all_headers['Content-Type'] = 'application/json'
+        elif isinstance(data, dict):
+            body = urlencode(data).encode('utf-8')
+            all_headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif isinstance(data, str):
+            body = data.encode('utf-8')
+        else:
+            body = data or b''
+        all_headers.update(headers or {})
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                resp = await self._send(method, url, body, all_headers)
+            except _StaleConnection:
+                continue
+            except (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as err:
+                if attempt > retries:
+                    raise
+                print('{} {} failed ({!r}). Retrying (#{} out of {} attempts).'.format(method, url, err, attempt,
+                                                                                     retries))
+                await asyncio.sleep(cdsw_transport.backoff_delay(attempt))
+                continue
+            if resp.status_code in expected_codes:
+                return resp
+            if resp.status_code in cdsw_transport.RETRY_STATUS and attempt <= retries:
+                print('{} {} returned {}. Retrying (#{} out of {} attempts).'.format(method, url, resp.status_code,
+                                                                                    attempt, retries))
+                await asyncio.sleep(cdsw_transport.backoff_delay(attempt))
+                continue
+            print(resp.text)
+            raise RuntimeError("Unexpected response: {}".format(resp))
+
+    async def get(self, url, expected_codes=None, **kwargs):
+        return await self.request('GET', url, expected_codes, **kwargs)
+
+    async def post(self, url, expected_codes=None, **kwargs):
+        return await self.request('POST', url, expected_codes, **kwargs)
+
+    async def put(self, url, expected_codes=None, **kwargs):
+        return await self.request('PUT', url, expected_codes, **kwargs)
+
+    async def patch(self, url, expected_codes=None, **kwargs):
+        return await self.request('PATCH', url, expected_codes, **kwargs)
+
+    async def delete(self, url, expected_codes=None, **kwargs):
+        return await self.request('DELETE', url, expected_codes, **kwargs)
+
+    def project_url(self, project_name, path=''):
+        return '{}/projects/{}/{}{}'.format(self.api, cdsw_setup.USERNAME, project_name, path)
+
+    async def authorize(self, password):
+        resp = await self.post(self.api + '/authenticate', idempotent=True,
+                               json={'login': cdsw_setup.USERNAME, 'password': password})
+        self.headers['Authorization'] = 'Bearer ' + resp.json()['auth_token']
+
+    async def _project_index(self, page_size=project_catalog.PAGE_SIZE):
+        """({name: project}, {id: project}) of all the projects, fetched page by page like ``ProjectCatalog``."""
+        by_name = {}
+        by_id = {}
+        offset = 0
+        while True:
+            resp = await self.get(self.api + '/users/admin/projects', params={'limit': page_size, 'offset': offset})
+            page = resp.json()
+            if not project_catalog.add_page(by_name, by_id, page, page_size):
+                break
+            offset += len(page)
+        return by_name, by_id
+
+    async def list_projects(self):
+        _, by_id = await self._project_index()
+        return list(by_id.values())
+
+    async def get_project(self, name=None, project_id=None):
+        if (not name and not project_id) or (name and project_id):
+            raise RuntimeError("Must specify either name or id, but not both.")
+        by_name, by_id = await self._project_index()
+        return by_name.get(name, {}) if name else by_id.get(project_id, {})
+
+    async def job_status(self, project_name, job_id):
+        resp = await self.get(self.project_url(project_name, '/jobs/{}'.format(job_id)))
+        return resp.json()['latest']['status']
+
+    async def list_models(self):
+        resp = await self.post(self.altus_api + '/models/list-models', idempotent=True,
+                               json={
+                                   'projectOwnerName': 'admin',
+                                   'latestModelDeployment': True,
+                                   'latestModelBuild': True,
+                               })
+        return resp.json()
+
+    async def get_model(self, name):
+        models = [m for m in await self.list_models() if m['name'] == name]
+        return models[0] if models else {}
+
+    async def start_model(self, build_id, spec=None, replicas=None):
+        params = {'modelBuildId': build_id}
+        params.update(cdsw_setup.deployment_params(
+            cdsw_setup.model_resources(spec) if spec else cdsw_setup.DEFAULT_RESOURCES, replicas))
+        await self.post(self.altus_api + '/models/deploy-model', idempotent=True, json=params)
+
+    async def call_model(self, access_key, request):
+        """Response of the model with ``access_key`` to ``request`` (see ``model_client``)."""
+        resp = await self.post(self.model_service, idempotent=True, json={'accessKey': access_key, 'request': request})
+        result = resp.json()
+        if not result.get('success', False):
+            raise RuntimeError('Model call failed: {}'.format(result))
+        return result['response']
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.close()
+        self._pools = {}
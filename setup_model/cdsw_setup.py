@@ -0,0 +1,955 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Deployment engine for the car insurance CDSW models.
+
+Cluster-wide work (user creation, authentication, release and runtime
+discovery, site configuration) happens once per run in ``prepare()``. Each
+entry of ``model_manifest.MODELS`` is then deployed with ``deploy_model()``.
+Every phase runs in a ``tracing`` span named after it, and the phases that
+create something record their ids in ``deploy_state`` checkpoints, so a rerun
+after a failure resumes at the first incomplete phase.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import artifact_digests
+import cdsw_transport
+import cdsw_upload
+import deploy_state
+import model_cache
+import polling
+import project_catalog
+import runtime_catalog
+import tracing
+
+BASE_DIR = os.path.dirname(__file__) if os.path.dirname(__file__) else '.'
+_IS_TLS_ENABLED = os.path.exists(os.path.join(BASE_DIR, '.enable-tls'))
+
+TRUSTSTORE = '/opt/cloudera/security/x509/truststore.pem'
+URL_SCHEME = 'https' if _IS_TLS_ENABLED else 'http'
+
+USERNAME = 'admin'
+FULL_NAME = 'Workshop Admin'
+EMAIL = 'admin@cloudera.com'
+
+_DEFAULT_RUNTIME_SPEC = ('Workbench', 'Python 3.8', 'Standard', '2022.04')
+
+# Wheels are built once into a wheelhouse of the project, so running the setup job again
+# (e.g. after a change of requirements.txt) only downloads and builds what is new.
+_WHEELHOUSE = '/home/cdsw/.cache/wheelhouse'
+_SETUP_SCRIPT = """!pip3 wheel -q --wheel-dir {0} --find-links {0} -r requirements.txt
+!pip3 install -U --no-index --find-links {0} -r requirements.txt""".format(_WHEELHOUSE)
+_JOB_ACTIVE = ('scheduling', 'starting', 'running')
+_JOB_ENDED = ('failed', 'stopped', 'timedout')
+
+# Batch variant of a model function: loads the model file once and answers
+# {'images': [...]} with {'results': [...]}, one result (or error) per image.
+_BATCH_WRAPPER = """import importlib.util
+
+_spec = importlib.util.spec_from_file_location('{module}', '{target_file_path}')
+_model = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_model)
+
+
+def {function}Batch(args):
+    results = []
+    for image in args['images']:
+        try:
+            results.append(_model.{function}({{'imageBase64': image}}))
+        except Exception as err:
+            results.append({{'error': str(err)}})
+    return {{'results': results}}
+"""
+
+# Resources of a model deployment; a manifest entry overrides them with its 'resources'.
+# 'replicas' is the replica count of a new deployment, which model_autoscaler moves
+# between 'min_replicas' and 'max_replicas'. 'replica_concurrency' (requests one
+# replica serves at a time) and 'latency_slo' (seconds, p95) also drive the autoscaler.
+DEFAULT_RESOURCES = {
+    'cpu_millicores': 1000,
+    'memory_mb': 4096,
+    'replicas': 1,
+    'min_replicas': 1,
+    'max_replicas': 1,
+    'replica_concurrency': 1,
+    'latency_slo': None,
+}
+
+# Responses of a create call carrying a runtime id that may mean the id is stale
+_RUNTIME_REJECTED = (400, 404, 422)
+
+# Successful builds remembered per model for reuse by a later deploy of the same files
+_KEPT_BUILDS = 10
+
+# Deadlines (in seconds) of the wait loops
+_USER_DEADLINE = 3600
+_RUNTIME_DEADLINE = 600
+_JOB_DEADLINE = 3600
+_MODEL_DEADLINE = 3600
+# Longest pause between two checks of a job, build or deployment, so its end is noticed within seconds
+_POLL_MAX_DELAY = 10
+
+
+def cluster_url(public_ip):
+    """Base URL of the cluster; ``public_ip`` may also be a full URL such as a local fake_cdsw server."""
+    if public_ip.startswith('http://') or public_ip.startswith('https://'):
+        return public_ip.rstrip('/')
+    return URL_SCHEME + '://cdsw.{}.nip.io'.format(public_ip, )
+
+
+def model_service_url(public_ip):
+    """URL the deployed models are called at."""
+    if public_ip.startswith('http://') or public_ip.startswith('https://'):
+        return public_ip.rstrip('/') + '/model'
+    return URL_SCHEME + '://modelservice.cdsw.{}.nip.io/model'.format(public_ip, )
+
+
+def model_resources(spec):
+    """Deployment resources of the model of ``spec``: the defaults updated with its 'resources'."""
+    resources = dict(DEFAULT_RESOURCES)
+    resources.update(spec.get('resources', {}))
+    if not resources['min_replicas'] <= resources['replicas'] <= resources['max_replicas']:
+        raise RuntimeError('Invalid replica profile for {}: {}'.format(spec['name'], resources))
+    return resources
+
+
+def deployment_params(resources, replicas=None):
+    """create-model/deploy-model parameters for ``resources``, with ``replicas`` fixed replicas if given."""
+    return {
+        'cpuMillicores': resources['cpu_millicores'],
+        'memoryMb': resources['memory_mb'],
+        'replicationPolicy': {'type': 'fixed', 'numReplicas': replicas or resources['replicas']},
+    }
+
+
+def batch_spec(spec):
+    """Spec of the batch variant of the model of ``spec``, served from the same project."""
+    function = spec['target_function_name']
+    batch = dict(spec)
+    batch.update({
+        'name': spec['name'] + ' Batch',
+        'target_file_path': 'batch/{}_batch.py'.format(function),
+        'target_function_name': function + 'Batch',
+        'examples': [{'request': {'images': [e['request']['imageBase64'] for e in spec['examples']]}}],
+        'resources': spec.get('batch_resources', spec.get('resources', {})),
+    })
+    return batch
+
+
+def deployed_build(model):
+    """Id of the build the latest deployment of ``model`` runs (the latest build if the API does not say)."""
+    return model['latestModelDeployment'].get('buildId') or model['latestModelBuild']['id']
+
+
+def deployed_replicas(model):
+    """Replica count of the latest deployment of ``model``, or None if the API does not report it."""
+    policy = model['latestModelDeployment'].get('replicationPolicy') or {}
+    return policy.get('numReplicas')
+
+
+class Cdsw(object):
+    """Connection and cached site state for one CDSW cluster."""
+
+    def __init__(self, public_ip, password, runtimes=None, state=None):
+        self.public_ip = public_ip
+        self.password = password
+        base_url = cluster_url(public_ip)
+        self.api = base_url + '/api/v1'
+        self.altus_api = base_url + '/api/altus-ds-1'
+        self.model_service = model_service_url(public_ip)
+        self.session = cdsw_transport.new_session()
+        self.user_id = None
+        self._release = []
+        self._runtimes = []
+        self._default_runtime = 0
+        self.models = model_cache.ModelCache(self.list_models)
+        self.projects = project_catalog.ProjectCatalog(self.list_projects)
+        self.runtime_catalog = runtimes or runtime_catalog.RuntimeCatalog()
+        self.state = state or deploy_state.DeployState()
+
+    def get(self, url, expected_codes=None, **kwargs):
+        return cdsw_transport.rest_call(self.session, 'GET', url, expected_codes, **kwargs)
+
+    def post(self, url, expected_codes=None, **kwargs):
+        return cdsw_transport.rest_call(self.session, 'POST', url, expected_codes, **kwargs)
+
+    def put(self, url, expected_codes=None, **kwargs):
+        return cdsw_transport.rest_call(self.session, 'PUT', url, expected_codes, **kwargs)
+
+    def patch(self, url, expected_codes=None, **kwargs):
+        return cdsw_transport.rest_call(self.session, 'PATCH', url, expected_codes, **kwargs)
+
+    def delete(self, url, expected_codes=None, **kwargs):
+        return cdsw_transport.rest_call(self.session, 'DELETE', url, expected_codes, **kwargs)
+
+    def checkpoints(self, scope):
+        """Phase checkpoints of ``scope`` ('site' or a model name) on this cluster."""
+        return deploy_state.Checkpoints(self.state, self.api, scope)
+
+    def project_url(self, project_name, path=''):
+        return '{}/projects/{}/{}{}'.format(self.api, USERNAME, project_name, path)
+
+    def init_session(self):
+        print("Initializing sessions")
+        if _IS_TLS_ENABLED:
+            print("Setting truststore")
+            self.session.verify = TRUSTSTORE
+
+    @tracing.traced('create_user')
+    def create_user(self):
+        print('# Create user')
+
+        def check():
+            try:
+                resp = self.post(self.api + '/users', expected_codes=[201, 404, 422, 503],
+                                 json={
+                                     'email': EMAIL,
+                                     'name': FULL_NAME,
+                                     'username': USERNAME,
+                                     'password': self.password,
+                                     'type': 'user'
+                                 },
+                                 timeout=10)
+                if resp.status_code == 201:
+                    print('User created')
+                    return True
+                elif resp.status_code == 422:
+                    print('User admin already exists. Skipping creation.')
+                    return True
+                status = 'Error code: {}'.format(resp.status_code)
+            except requests.exceptions.ConnectTimeout as err:
+                status = 'Connection timeout. Exception: {}'.format(err)
+            except requests.exceptions.ConnectionError as err:
+                status = 'Connection error. Exception: {}'.format(err)
+            print('Waiting for CDSW to be ready... ({})'.format(status))
+            return polling.Pending(status.split('.')[0])
+
+        polling.wait_for(check, 'CDSW to be ready', deadline=_USER_DEADLINE, initial_delay=2, max_delay=15)
+
+    @tracing.traced('authenticate')
+    def authorize(self):
+        print("Authorizing sessions")
+        resp = self.post(self.api + '/authenticate', idempotent=True,
+                         json={'login': USERNAME, 'password': self.password})
+        token = resp.json()['auth_token']
+        self.session.headers.update({'Authorization': 'Bearer ' + token})
+
+    def get_user_id(self):
+        if self.user_id is None:
+            resp = self.get(self.api + '/users')
+            user = [u for u in resp.json() if u['username'] == USERNAME]
+            self.user_id = user[0]['id']
+            print('User ID: {}'.format(self.user_id))
+        return self.user_id
+
+    def get_release(self):
+        if not self._release:
+            resp = self.get(self.api + '/site/stats')
+            release_str = [c['value'] for c in resp.json() if c['key'] == 'config.release'][0]
+            self._release = [int(v) for v in release_str.split('.')]
+            print('CDSW release: {}'.format(self._release))
+        return self._release
+
+    def get_runtimes(self, refresh=False):
+        if not self._runtimes or refresh:
+            resp = self.get(self.api + '/runtimes?includeAll=true', expected_codes=[200, 501])
+            if resp.status_code == 200:
+                self._runtimes = resp.json()['runtimes']
+            elif resp.status_code == 501:
+                self._runtimes = []
+                print("List of runtimes not available yet.")
+        return self._runtimes
+
+    @tracing.traced('runtime_discovery')
+    def find_runtime(self, editor, kernel, edition, short_version, deadline=_RUNTIME_DEADLINE):
+        release = self.get_release()
+        runtime_id = self.runtime_catalog.lookup(self.api, release, editor, kernel, edition, short_version)
+        if runtime_id:
+            print('Runtime found in the local runtime catalog.')
+            return runtime_id
+        key = runtime_catalog.runtime_key(editor, kernel, edition, short_version)
+
+        def check():
+            runtimes = self.get_runtimes(refresh=True)
+            if runtimes:
+                index = self.runtime_catalog.store(self.api, release, runtimes)
+                if key in index:
+                    return index[key]
+            print('Could not find the required runtime among the {} retrieved ones. Will retry.'.format(len(runtimes)))
+            return polling.Pending(len(runtimes))
+
+        try:
+            return polling.wait_for(check, 'runtime {} {} {} {}'.format(editor, kernel, edition, short_version),
+                                    deadline=deadline, max_delay=10)
+        except polling.WaitTimeout:
+            raise RuntimeError('Could not find the required runtime. Giving up. Available runtimes: {}'.format(
+                self._runtimes))
+
+    def get_default_runtime(self):
+        if not self._default_runtime:
+            self._default_runtime = self.find_runtime(*_DEFAULT_RUNTIME_SPEC)
+            print('Default Runtime ID: {}'.format(self._default_runtime, ))
+        return self._default_runtime
+
+    def forget_runtime(self):
+        """Drops the runtime ids cached for this cluster, e.g. after it rejected one; the next use looks it up."""
+        self.runtime_catalog.forget(self.api, self.get_release())
+        self._default_runtime = 0
+
+    def workload_runtime(self):
+        """Runtime the jobs and models run on, or None before CDSW 1.10 (engine images only)."""
+        return self.get_default_runtime() if self.get_release() >= [1, 10] else None
+
+    def list_projects(self, limit, offset):
+        resp = self.get(self.api + '/users/admin/projects', params={'limit': limit, 'offset': offset})
+        return resp.json()
+
+    def get_project(self, name=None, project_id=None):
+        return self.projects.get(name=name, project_id=project_id)
+
+    def list_models(self):
+        resp = self.post(self.altus_api + '/models/list-models', idempotent=True,
+                         json={
+                             'projectOwnerName': 'admin',
+                             'latestModelDeployment': True,
+                             'latestModelBuild': True,
+                         })
+        return resp.json()
+
+    def get_model(self, name, max_age=None):
+        """Latest state of model ``name`` from the shared cache, at most ``max_age`` seconds old."""
+        return self.models.get(name, max_age)
+
+
+def _log(spec, msg):
+    print('[{}] {}'.format(spec['name'], msg))
+
+
+def _find_project(cdsw, spec):
+    cdsw.projects.invalidate()
+    return cdsw.get_project(name=spec['project_name'])
+
+
+def _create_github_project(cdsw, spec):
+    # A long clone can end in a 502 although the project gets created
+    return _create(cdsw, cdsw.api + '/users/admin/projects',
+                   {'template': 'git',
+                    'project_visibility': 'private',
+                    'name': spec['project_name'],
+                    'gitUrl': spec['git_url']},
+                   lambda: _find_project(cdsw, spec), expected_codes=[201])
+
+
+def _create_local_project(cdsw, spec, zipfile):
+    filename = os.path.basename(zipfile)
+    token = cdsw_upload.upload_file(cdsw, zipfile, upload_type='archive')
+
+    return _create(cdsw, cdsw.api + '/users/admin/projects',
+                   {
+                       "name": spec['project_name'],
+                       "project_visibility": "private",
+                       "template": "local",
+                       "isPrototype": False,
+                       "supportAsync": True,
+                       "avoidNameCollisions": False,
+                       "uploadToken": token,
+                       "fileName": filename,
+                       "isArchive": True
+                   },
+                   lambda: _find_project(cdsw, spec), expected_codes=[201])
+
+
+def start_model(cdsw, build_id, spec=None, replicas=None):
+    """Deploys build ``build_id`` with the resources of ``spec`` (the defaults if None)."""
+    params = {'modelBuildId': build_id}
+    params.update(deployment_params(model_resources(spec) if spec else DEFAULT_RESOURCES, replicas))
+    # Deploying the same build again is harmless, so the call can be retried
+    cdsw.post(cdsw.altus_api + '/models/deploy-model', idempotent=True, json=params)
+    cdsw.models.invalidate()
+
+
+def scale_model(cdsw, spec, replicas):
+    """Redeploys the running build of the model of ``spec`` with ``replicas`` replicas."""
+    model = cdsw.get_model(spec['name'], max_age=0)
+    if not model:
+        raise RuntimeError('Model {} not found'.format(spec['name']))
+    build_id = deployed_build(model)
+    _log(spec, 'Scaling build {} from {} to {} replicas'.format(build_id, deployed_replicas(model), replicas))
+    start_model(cdsw, build_id, spec, replicas)
+
+
+def _replicas_to_keep(spec, model):
+    """Replica count to redeploy ``model`` with: the current one, within the profile's limits."""
+    resources = model_resources(spec)
+    current = deployed_replicas(model) or resources['replicas']
+    return min(max(current, resources['min_replicas']), resources['max_replicas'])
+
+
+def _resources_changed(spec, model):
+    deployment = model['latestModelDeployment']
+    if deployment.get('cpuMillicores') is None or deployment.get('memoryMb') is None:
+        return False
+    resources = model_resources(spec)
+    return (deployment['cpuMillicores'] != resources['cpu_millicores']
+            or deployment['memoryMb'] != resources['memory_mb']
+            or deployed_replicas(model) not in (None, _replicas_to_keep(spec, model)))
+
+
+def _sign_in(cdsw, site):
+    """Creates the admin user and authenticates, unless a previous run created it already."""
+    if site.done('create_user'):
+        cdsw.user_id = site.get('user_id')
+        try:
+            cdsw.authorize()
+            return
+        except (RuntimeError, requests.exceptions.RequestException) as err:
+            print('Authentication failed ({}). Creating the user again.'.format(err))
+            site.forget('create_user')
+            cdsw.user_id = None
+    cdsw.create_user()
+    cdsw.authorize()
+
+
+def _site_config(cdsw, models):
+    config = {}
+    environment = {}
+    for spec in models:
+        environment.update(spec.get('site_environment', {}))
+    config['environment'] = json.dumps(environment)
+    # See https://docs.cloudera.com/cdsw/latest/analytical-apps/topics/cdsw-application-limitations.html
+    if cdsw.get_release() > [1, 9]:
+        config['allow_unauthenticated_access_to_app'] = True
+    return config
+
+
+def _create(cdsw, url, params, find, expected_codes=None, runtime_key=None):
+    """POSTs ``params`` to ``url`` to create an object, and returns the JSON of the created object.
+
+    A creation is not replayed blindly: the cluster may have carried it out before a
+    502/503/504 or a dropped connection. ``find()`` first looks for the object, and
+    returns it, or None if the POST has to be sent again.
+
+    If the call is rejected and ``params`` has a ``runtime_key``, the runtime is looked up
+    again once: the id may come from the local runtime catalog and no longer exist on the
+    cluster.
+    """
+    expected_codes = list(expected_codes or [200])
+    rejected = list(_RUNTIME_REJECTED) if runtime_key in params else []
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            resp = cdsw.post(url, expected_codes=expected_codes + list(cdsw_transport.RETRY_STATUS) + rejected,
+                             json=params)
+        except cdsw_transport.RETRY_EXCEPTIONS as err:
+            if attempt > cdsw_transport.RETRIES:
+                raise
+            failure = err
+        else:
+            if resp.status_code in expected_codes:
+                return resp.json()
+            if resp.status_code in rejected:
+                print('{} returned {} ({}). Looking runtime {} up again.'.format(url, resp.status_code,
+                                                                               resp.text.strip(), params[runtime_key]))
+                cdsw.forget_runtime()
+                params = dict(params)
+                params[runtime_key] = cdsw.get_default_runtime()
+                rejected = []
+                continue
+            if attempt > cdsw_transport.RETRIES:
+                print(resp.text)
+                raise RuntimeError("Unexpected response: {}".format(resp))
+            failure = resp.status_code
+        found = find()
+        if found:
+            print('POST {} failed ({}) but was carried out: found {}.'.format(url, failure, found['id']))
+            return found
+        print('POST {} failed ({}). Retrying (#{} out of {} attempts).'.format(url, failure, attempt,
+                                                                             cdsw_transport.RETRIES))
+        time.sleep(cdsw_transport.backoff_delay(attempt))
+
+
+def _find_engine_profile(cdsw, cpu, memory):
+    for profile in cdsw.get(cdsw.api + '/site/engine-profiles').json():
+        if profile.get('cpu') == cpu and profile.get('memory') == memory:
+            return profile
+    return None
+
+
+@tracing.traced('prepare')
+def prepare(cdsw, models):
+    """Cluster-wide setup shared by every model of the run; completed phases of earlier runs are skipped."""
+    print('# Prepare CDSW for workshop')
+    site = cdsw.checkpoints('site')
+    cdsw.init_session()
+    _sign_in(cdsw, site)
+    site.complete('create_user', user_id=cdsw.get_user_id())
+    if cdsw.get_release() >= [1, 10]:
+        cdsw.get_default_runtime()
+
+    print('# Add engine')
+    if not site.done('engine_profile'):
+        profile = _create(cdsw, cdsw.api + '/site/engine-profiles', {'cpu': 1, 'memory': 4},
+                          lambda: _find_engine_profile(cdsw, 1, 4), expected_codes=[201])
+        site.complete('engine_profile', engine_id=profile['id'])
+    else:
+        print('Engine profile added by a previous run.')
+    print('Engine ID: {}'.format(site.get('engine_id'), ))
+
+    print('# Add environment variables')
+    config = _site_config(cdsw, models)
+    fingerprint = artifact_digests.sha256_bytes(json.dumps(config, sort_keys=True).encode('utf-8'))
+    if site.get('site_config') == fingerprint:
+        print('Site configuration unchanged. Skipping.')
+        return
+    cdsw.patch(cdsw.api + '/site/config', idempotent=True,
+               json={'environment': config['environment']})
+    if 'allow_unauthenticated_access_to_app' in config:
+        print('# Allow applications to be configured with unauthenticated access')
+        resp = cdsw.patch(cdsw.api + '/site/config', idempotent=True,
+                          json={"allow_unauthenticated_access_to_app": True})
+        print('Set unauthenticated access flag to: {}'.format(resp.json()["allow_unauthenticated_access_to_app"], ))
+    site.complete('site_config', site_config=fingerprint)
+
+
+def _model_params(cdsw, spec, engine_image_id):
+    if cdsw.get_release() >= [1, 10]:
+        params = {
+            'runtimeId': cdsw.get_default_runtime(),
+            'authEnabled': True,
+            "addons": [],
+        }
+    else:
+        params = {}
+    params.update({
+        'targetFilePath': spec['target_file_path'],
+        'targetFunctionName': spec['target_function_name'],
+        'engineImageId': engine_image_id,
+        'kernel': 'python3',
+        'examples': spec['examples'],
+    })
+    return params
+
+
+@tracing.traced('project_creation')
+def _ensure_project(cdsw, spec, project_zip_file):
+    _log(spec, '# Add project')
+    if not cdsw.get_project(name=spec['project_name']):
+        if project_zip_file:
+            _log(spec, 'Creating a Local project using file {}'.format(project_zip_file))
+            created = _create_local_project(cdsw, spec, project_zip_file)
+        else:
+            _log(spec, 'Creating a GitHub project')
+            created = _create_github_project(cdsw, spec)
+        if 'id' in created and 'name' in created:
+            cdsw.projects.add(created)
+        else:
+            cdsw.projects.invalidate()
+    project = cdsw.get_project(name=spec['project_name'])
+    _log(spec, 'Project ID: {}'.format(project['id'], ))
+    checkpoints = cdsw.checkpoints(spec['name'])
+    if checkpoints.get('project_id') not in (None, project['id']):
+        # The project was recreated: the checkpoints of the old one do not apply
+        checkpoints.forget()
+    checkpoints.complete('project_creation', project_id=project['id'])
+    return project
+
+
+def _remote_file_size(cdsw, spec):
+    """Size of the artifact in the project according to the file listing, or None if unknown."""
+    directory, _, filename = spec['project_file'].rpartition('/')
+    resp = cdsw.get(cdsw.project_url(spec['project_name'], '/files/' + directory), expected_codes=[200, 404])
+    if resp.status_code == 404:
+        return -1
+    try:
+        entries = resp.json()
+    except ValueError:
+        return None
+    if not isinstance(entries, list):
+        return None
+    for entry in entries:
+        if isinstance(entry, dict) and entry.get('name') == filename:
+            return entry.get('size')
+    return -1
+
+
+@tracing.traced('artifact_upload')
+def _upload_artifact(cdsw, spec, model_file, digests):
+    """Uploads the model artifact unless the same bytes are already in the project.
+
+    Returns True if the artifact was uploaded.
+    """
+    key = '{}/{}'.format(spec['project_name'], spec['project_file'])
+    digest = artifact_digests.sha256_file(model_file)
+    size = os.stat(model_file).st_size
+    if digests.unchanged(cdsw.api, key, digest):
+        remote_size = _remote_file_size(cdsw, spec)
+        if remote_size is None or remote_size == size:
+            _log(spec, 'Artifact {} unchanged (sha256 {}). Skipping upload.'.format(spec['project_file'], digest[:12]))
+            return False
+        _log(spec, 'Artifact {} has size {} in the project, expected {}.'.format(spec['project_file'], remote_size,
+                                                                                size))
+
+    _log(spec, '# Upload model')
+    cdsw_upload.put_file(cdsw, cdsw.project_url(spec['project_name'], '/files/' + spec['project_file']),
+                         model_file)
+    digests.record(cdsw.api, key, digest, size)
+    return True
+
+
+def _job_status(cdsw, spec, job_id):
+    """Status of job ``job_id`` of the project of ``spec``, or None if the job does not exist."""
+    resp = cdsw.get(cdsw.project_url(spec['project_name'], '/jobs/{}'.format(job_id)), expected_codes=[200, 404])
+    return resp.json()['latest']['status'] if resp.status_code == 200 else None
+
+
+def _project_file_digest(cdsw, spec, path):
+    """SHA-256 of file ``path`` of the project of ``spec``, or None if there is no such file."""
+    resp = cdsw.get(cdsw.project_url(spec['project_name'], '/files/' + path), expected_codes=[200, 404])
+    return artifact_digests.sha256_bytes(resp.content) if resp.status_code == 200 else None
+
+
+def _environment_fingerprint(cdsw, spec):
+    """Digest of what the setup job installs: requirements.txt of the project, runtime and setup script."""
+    parts = {
+        'requirements': _project_file_digest(cdsw, spec, 'requirements.txt'),
+        'runtime': cdsw.workload_runtime(),
+        'script': artifact_digests.sha256_bytes(_SETUP_SCRIPT.encode('utf-8')),
+    }
+    return artifact_digests.sha256_bytes(json.dumps(parts, sort_keys=True).encode('utf-8'))
+
+
+def _find_job(cdsw, spec, name):
+    for job in cdsw.get(cdsw.project_url(spec['project_name'], '/jobs')).json():
+        if job['name'] == name:
+            return job
+    return None
+
+
+def _find_active_job(cdsw, spec, job_id):
+    """Job ``job_id`` of the project of ``spec`` if it is running (or about to), else None."""
+    resp = cdsw.get(cdsw.project_url(spec['project_name'], '/jobs/{}'.format(job_id)), expected_codes=[200, 404])
+    if resp.status_code == 200 and resp.json()['latest']['status'] in _JOB_ACTIVE:
+        return resp.json()
+    return None
+
+
+def _create_setup_job(cdsw, spec):
+    job_params = {
+        'name': 'Setup workshop',
+        'type': 'manual',
+        'script': 'setup_workshop.py',
+        'timezone': 'America/Los_Angeles',
+        'environment': {},
+        'kernel': 'python3',
+        'cpu': 1,
+        'memory': 4,
+        'nvidia_gpu': 0,
+        'notifications': [{
+            'user_id': cdsw.get_user_id(),
+            'success': False,
+            'failure': False,
+            'timeout': False,
+            'stopped': False
+        }],
+        'recipients': {},
+        'attachments': [],
+    }
+    if cdsw.get_release() >= [1, 10]:
+        job_params.update({'runtime_id': cdsw.get_default_runtime()})
+
+    _log(spec, '# Create job to run the setup script')
+    job = _create(cdsw, cdsw.project_url(spec['project_name'], '/jobs'), job_params,
+                  lambda: _find_job(cdsw, spec, job_params['name']), expected_codes=[201], runtime_key='runtime_id')
+    job_id = job['id']
+    _log(spec, 'Job ID: {}'.format(job_id, ))
+    return job_id
+
+
+def _wait_for_job(cdsw, spec, job_id, fail=True):
+    """Waits for job ``job_id`` to end; returns its final status, raising if it failed and ``fail``."""
+    job_url = cdsw.project_url(spec['project_name'], '/jobs/{}'.format(job_id))
+
+    def check():
+        resp = cdsw.get(job_url)
+        status = resp.json()['latest']['status']
+        _log(spec, 'Job {} status: {}'.format(job_id, status))
+        if status == 'succeeded':
+            return status
+        elif status in _JOB_ENDED:
+            if not fail:
+                return status
+            print(resp.text)
+            raise RuntimeError('Job failed')
+        return polling.Pending(status)
+
+    return polling.wait_for(check, 'setup job {}'.format(job_id), deadline=_JOB_DEADLINE, max_delay=_POLL_MAX_DELAY)
+
+
+@tracing.traced('setup_job')
+def _run_setup_job(cdsw, spec):
+    """Installs the project requirements with the setup job, unless it already installed the same ones.
+
+    The installed environment is identified by ``_environment_fingerprint``. The job of a
+    previous run is reused (waited for if still running, restarted otherwise) rather than
+    created again.
+    """
+    checkpoints = cdsw.checkpoints(spec['name'])
+    environment = _environment_fingerprint(cdsw, spec)
+    job_id = checkpoints.get('job_id')
+    if checkpoints.done('setup_job') and checkpoints.get('job_environment') == environment:
+        _log(spec, 'Setup job {} already installed these requirements on this runtime. Skipping.'.format(job_id))
+        return
+    status = _job_status(cdsw, spec, job_id) if job_id else None
+    if status in _JOB_ACTIVE:
+        _log(spec, 'Waiting for setup job {} of a previous run ({})'.format(job_id, status))
+        status = _wait_for_job(cdsw, spec, job_id, fail=False)
+
+    if status == 'succeeded' and checkpoints.get('job_environment') == environment:
+        _log(spec, 'Setup job {} of a previous run installed these requirements.'.format(job_id))
+    else:
+        checkpoints.forget('setup_job')
+        _log(spec, '# Upload setup script')
+        cdsw.put(cdsw.project_url(spec['project_name'], '/files/setup_workshop.py'),
+                 files={'name': _SETUP_SCRIPT})
+        if status is None:
+            job_id = _create_setup_job(cdsw, spec)
+        checkpoints.record(job_id=job_id, job_environment=environment)
+        _log(spec, '# Start job')
+        _create(cdsw, cdsw.project_url(spec['project_name'], '/jobs/{}/start'.format(job_id)), {},
+                lambda: _find_active_job(cdsw, spec, job_id))
+        _wait_for_job(cdsw, spec, job_id)
+    checkpoints.complete('setup_job', job_id=job_id)
+
+
+@tracing.traced('engine_image')
+def _get_engine_image(cdsw, spec):
+    _log(spec, '# Get engine image to use for model')
+    resp = cdsw.get(cdsw.project_url(spec['project_name'], '/engine-images'))
+    engine_image_id = resp.json()['id']
+    _log(spec, 'Engine image ID: {}'.format(engine_image_id, ))
+    return engine_image_id
+
+
+@tracing.traced('model_create')
+def _create_model(cdsw, spec, project):
+    engine_image_id = _get_engine_image(cdsw, spec)
+    _log(spec, '# Deploy model')
+    params = _model_params(cdsw, spec, engine_image_id)
+    params.update({
+        'projectId': project['id'],
+        'name': spec['name'],
+        'description': spec['name'],
+        'visibility': 'private',
+        'environment': {},
+    })
+    params.update(deployment_params(model_resources(spec)))
+    model = _create(cdsw, cdsw.altus_api + '/models/create-model', params,
+                    lambda: cdsw.get_model(spec['name'], max_age=0), runtime_key='runtimeId')
+    cdsw.models.invalidate()
+    try:
+        model_id = model['id']
+    except Exception as err:
+        print(model)
+        raise err
+    _log(spec, 'Model ID: {}'.format(model_id, ))
+    cdsw.checkpoints(spec['name']).complete('model_create', model_id=model_id)
+
+
+def _find_new_build(cdsw, spec, model):
+    """Latest build of the model of ``spec`` if it is newer than the latest build of ``model``, else None."""
+    build = cdsw.get_model(spec['name'], max_age=0)['latestModelBuild']
+    return build if build['id'] != model['latestModelBuild']['id'] else None
+
+
+@tracing.traced('model_rebuild')
+def _rebuild_model(cdsw, spec, project, model):
+    engine_image_id = _get_engine_image(cdsw, spec)
+    _log(spec, '# Build new version of model {}'.format(model['id']))
+    params = _model_params(cdsw, spec, engine_image_id)
+    params.update({
+        'projectId': project['id'],
+        'modelId': model['id'],
+        'comment': 'Artifact update',
+    })
+    build = _create(cdsw, cdsw.altus_api + '/models/build-model', params,
+                    lambda: _find_new_build(cdsw, spec, model), runtime_key='runtimeId')
+    cdsw.models.invalidate()
+    build_id = build['id']
+    _log(spec, 'Build ID: {}'.format(build_id, ))
+    cdsw.checkpoints(spec['name']).record(model_id=model['id'], build_id=build_id)
+
+    def check():
+        build = cdsw.get_model(spec['name'], max_age=0)['latestModelBuild']
+        _log(spec, 'Build {} status: {}'.format(build['id'], build['status']))
+        if build['id'] == build_id and build['status'] == 'built':
+            return build
+        elif build['id'] == build_id and build['status'] == 'failed':
+            raise RuntimeError('Model build failed')
+        return polling.Pending((build['id'], build['status']))
+
+    polling.wait_for(check, 'build {}'.format(build_id), deadline=_MODEL_DEADLINE, max_delay=_POLL_MAX_DELAY)
+    start_model(cdsw, build_id, spec, _replicas_to_keep(spec, model))
+
+
+def _build_fingerprint(cdsw, spec, digests):
+    """Digest of what a build of ``spec`` is made of: its artifact, entry point file and function, and runtime.
+
+    The artifact digest comes from the upload record; the entry point file, which comes
+    with the project (or is the uploaded batch wrapper), is read back from the project.
+    """
+    artifact = digests.get(cdsw.api, '{}/{}'.format(spec['project_name'], spec['project_file']))
+    parts = {'target': [spec['target_file_path'], spec['target_function_name']],
+             'runtime': cdsw.workload_runtime(),
+             'artifact': artifact['sha256'] if artifact else None,
+             'target_file': _project_file_digest(cdsw, spec, spec['target_file_path'])}
+    return artifact_digests.sha256_bytes(json.dumps(parts, sort_keys=True).encode('utf-8'))
+
+
+def _record_build(cdsw, spec, model, digests):
+    """Remembers the build deployed for ``spec`` as the build of its current files."""
+    build_id = deployed_build(model)
+    checkpoints = cdsw.checkpoints(spec['name'])
+    builds = dict(checkpoints.get('builds', {}))
+    fingerprint = _build_fingerprint(cdsw, spec, digests)
+    builds.pop(fingerprint, None)
+    builds[fingerprint] = build_id
+    checkpoints.record(builds=dict(list(builds.items())[-_KEPT_BUILDS:]))
+
+
+def _reuse_build(cdsw, spec, model, digests):
+    """Deploys an earlier successful build of the current files of ``spec`` instead of building again.
+
+    Returns True if such a build was (or already is) deployed, False if a new build is needed.
+    """
+    build_id = cdsw.checkpoints(spec['name']).get('builds', {}).get(_build_fingerprint(cdsw, spec, digests))
+    if not build_id:
+        return False
+    deployment = model['latestModelDeployment']
+    if deployment.get('buildId') == build_id:
+        if deployment['status'] == 'failed':
+            return False
+        _log(spec, 'Build {} of these files is already deployed.'.format(build_id))
+        return True
+    _log(spec, 'Deploying build {}, built earlier from the same files, instead of building again'.format(build_id))
+    try:
+        start_model(cdsw, build_id, spec, _replicas_to_keep(spec, model))
+    except RuntimeError as err:
+        _log(spec, 'Cannot deploy build {} ({}). Building again.'.format(build_id, err))
+        return False
+    return True
+
+
+def _upload_batch_wrapper(cdsw, spec, batch, digests):
+    """Uploads the batch wrapper of ``spec`` unless unchanged; returns True if it was uploaded."""
+    wrapper = _BATCH_WRAPPER.format(module=spec['target_function_name'], target_file_path=spec['target_file_path'],
+                                    function=spec['target_function_name'])
+    key = '{}/{}'.format(spec['project_name'], batch['target_file_path'])
+    digest = artifact_digests.sha256_bytes(wrapper.encode('utf-8'))
+    if digests.unchanged(cdsw.api, key, digest):
+        return False
+    _log(batch, '# Upload batch wrapper')
+    cdsw.put(cdsw.project_url(spec['project_name'], '/files/' + batch['target_file_path']),
+             files={'name': wrapper})
+    digests.record(cdsw.api, key, digest, len(wrapper))
+    return True
+
+
+@tracing.traced('batch_model')
+def _deploy_batch_model(cdsw, spec, artifact_changed, digests):
+    """Deploys the batch variant of ``spec``; rebuilds it if the artifact or the wrapper changed."""
+    batch = batch_spec(spec)
+    uploaded = _upload_batch_wrapper(cdsw, spec, batch, digests)
+    project = cdsw.get_project(name=spec['project_name'])
+    model = cdsw.get_model(batch['name'])
+    if not model:
+        _create_model(cdsw, batch, project)
+    elif artifact_changed or uploaded or 'failed' in (model['latestModelBuild']['status'],
+                                                      model['latestModelDeployment']['status']):
+        if not _reuse_build(cdsw, batch, model, digests):
+            _rebuild_model(cdsw, batch, project, model)
+    elif _resources_changed(batch, model):
+        start_model(cdsw, deployed_build(model), batch, _replicas_to_keep(batch, model))
+    _wait_for_model(cdsw, batch, digests)
+
+
+@tracing.traced('model_wait')
+def _wait_for_model(cdsw, spec, digests=None):
+    _log(spec, '# Wait for model to start')
+
+    def check():
+        model = cdsw.get_model(spec['name'], max_age=0)
+        if not model:
+            return polling.Pending()
+        build_id = deployed_build(model)
+        # A deployment of an earlier build (see _reuse_build) does not depend on the latest build
+        build = model['latestModelBuild']
+        build_status = build['status'] if build['id'] == build_id else 'built'
+        deployment_status = model['latestModelDeployment']['status']
+        _log(spec, 'Model {}: build status: {}, deployment status: {}'.format(model['id'], build_status,
+                                                                              deployment_status))
+        if build_status == 'built' and deployment_status == 'deployed':
+            return model
+        elif build_status == 'built' and deployment_status == 'stopped':
+            # If the deployment stops for any reason, try to give it a little push
+            start_model(cdsw, build_id, spec, _replicas_to_keep(spec, model))
+        elif build_status == 'failed' or deployment_status == 'failed':
+            raise RuntimeError('Model deployment failed')
+        return polling.Pending((build_status, deployment_status))
+
+    model = polling.wait_for(check, 'model {}'.format(spec['name']), deadline=_MODEL_DEADLINE,
+                             max_delay=_POLL_MAX_DELAY)
+    cdsw.checkpoints(spec['name']).complete('model_wait', model_id=model['id'], build_id=deployed_build(model))
+    if digests is not None:
+        _record_build(cdsw, spec, model, digests)
+    return model
+
+
+def deploy_model(cdsw, spec, model_file, project_zip_file=None, digests=None):
+    """Creates the project, runs its setup job and deploys the model of ``spec``.
+
+    If the model already exists, only a changed artifact (or a failed build) triggers
+    an upload and a new build, only changed requirements a new run of the setup job,
+    and only changed resources a new deployment; otherwise
+    the deployment is left as is. A build is skipped when an earlier build of the same
+    files deployed successfully: that build is deployed again instead. A spec with
+    'batch' also gets its batch variant, built and started alongside the model.
+    """
+    if digests is None:
+        digests = artifact_digests.DigestManifest()
+
+    with tracing.span('model_deploy', model=spec['name']), ThreadPoolExecutor(max_workers=1) as executor:
+        _log(spec, '# Check if model is already running')
+        model = cdsw.get_model(spec['name'])
+        if model:
+            failed = 'failed' in (model['latestModelBuild']['status'], model['latestModelDeployment']['status'])
+            uploaded = _upload_artifact(cdsw, spec, model_file, digests)
+        else:
+            project = _ensure_project(cdsw, spec, project_zip_file)
+            uploaded = _upload_artifact(cdsw, spec, model_file, digests)
+        # A no-op unless the requirements, runtime or setup script changed since the job last ran
+        _run_setup_job(cdsw, spec)
+
+        # The batch variant is built from the same project: its build and start overlap those of the model
+        batch = executor.submit(tracing.bind(_deploy_batch_model), cdsw, spec, uploaded,
+                                digests) if spec.get('batch') else None
+        if not model:
+            _create_model(cdsw, spec, project)
+        elif uploaded or failed:
+            if not _reuse_build(cdsw, spec, model, digests):
+                project = cdsw.get_project(name=spec['project_name'])
+                _rebuild_model(cdsw, spec, project, model)
+        elif _resources_changed(spec, model):
+            _log(spec, 'Deployment resources differ from the model profile. Redeploying.')
+            start_model(cdsw, deployed_build(model), spec, _replicas_to_keep(spec, model))
+        else:
+            _log(spec, 'Model exists and its artifact is unchanged!! Skipping.')
+        _wait_for_model(cdsw, spec, digests)
+        if batch:
+            batch.result()
+        _log(spec, '# Model deployed successfully!')
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""HTTP transport shared by all CDSW calls.
+
+Sessions get a connection pool sized for concurrent deployments and
+connect-level retries (safe for every method, since nothing was sent).
+``rest_call()`` adds per-call timeouts and retries 502/503/504 responses and
+dropped connections for idempotent requests, with exponential backoff. Each
+call is recorded as an ``http`` span (see ``tracing``).
+"""
+
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import tracing
+
+# (connect, read) timeout in seconds applied when a call does not pass one
+DEFAULT_TIMEOUT = (10, 120)
+
+POOL_SIZE = 32
+CONNECT_RETRIES = 3
+
+RETRIES = 4
+RETRY_STATUS = (502, 503, 504)
+RETRY_BACKOFF = 0.5
+RETRY_MAX_BACKOFF = 20
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+RETRY_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ReadTimeout,
+)
+
+
+def new_session(pool_size=POOL_SIZE):
+    session = requests.Session()
+    retry = Retry(total=CONNECT_RETRIES, connect=CONNECT_RETRIES, read=0, status=0, redirect=5,
+                  backoff_factor=RETRY_BACKOFF)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _replayable(kwargs):
+    body = kwargs.get('data')
+    if hasattr(body, 'read'):
+        return hasattr(body, 'rewind')
+    return True
+
+
+def backoff_delay(attempt):
+    delay = min(RETRY_BACKOFF * (2 ** (attempt - 1)), RETRY_MAX_BACKOFF)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def rest_call(session, method, url, expected_codes=None, idempotent=None, retries=RETRIES, **kwargs):
+    """Sends one request, retrying transient failures of idempotent calls.
+
+    ``idempotent`` defaults to whether ``method`` is idempotent; pass True for
+    POSTs and PATCHes that are safe to replay (list calls, authentication,
+    site configuration, deploy-model). A status listed in
+    ``expected_codes`` is never retried.
+    """
+    if not expected_codes:
+        expected_codes = [200]
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    if not (idempotent and _replayable(kwargs)):
+        retries = 0
+
+    with tracing.span('http', method=method, url=url) as call:
+        resp = _send(session, method, url, expected_codes, retries, call, kwargs)
+        call.set(status=resp.status_code, request_bytes=_request_size(resp),
+                 response_bytes=len(resp.content))
+        return resp
+
+
+def _request_size(resp):
+    return int(resp.request.headers.get('Content-Length') or 0)
+
+
+def _send(session, method, url, expected_codes, retries, call, kwargs):
+    attempt = 0
+    while True:
+        attempt += 1
+        call.set(retries=attempt - 1)
+        if attempt > 1 and hasattr(kwargs.get('data'), 'rewind'):
+            kwargs['data'].rewind()
+        try:
+            resp = session.request(method, url, **kwargs)
+        except RETRY_EXCEPTIONS as err:
+            if attempt > retries:
+                raise
+            print('{} {} failed ({}). Retrying (#{} out of {} attempts).'.format(method, url, err, attempt, retries))
+            time.sleep(backoff_delay(attempt))
+            continue
+        if resp.status_code in expected_codes:
+            return resp
+        call.set(status=resp.status_code)
+        if resp.status_code in RETRY_STATUS and attempt <= retries:
+            print('{} {} returned {}. Retrying (#{} out of {} attempts).'.format(method, url, resp.status_code,
+                                                                                attempt, retries))
+            time.sleep(backoff_delay(attempt))
+            continue
+        print(resp.text)
+        raise RuntimeError("Unexpected response: {}".format(resp))
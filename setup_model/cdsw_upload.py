@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""Uploads of project archives and model artifacts to CDSW.
+
+``upload_file()`` uses the flow endpoint (/upload/<user>): chunks are read
+zero-copy from an mmap of the file, sent with bounded concurrency and retried
+individually on dropped connections and 502/503/504 responses (the retry
+policy of ``cdsw_transport``); the first chunk that still fails cancels the
+chunks not sent yet. Completed chunks are recorded in a journal file next to the
+upload, so an interrupted upload resumes with the same uploadToken and only
+sends the missing chunks.
+
+``put_file()`` streams a single file into a project as a multipart body of
+known length, so memory use does not grow with the artifact size.
+"""
+
+import json
+import math
+import mmap
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+UPLOAD_CHUNK_SIZE = 1048576
+UPLOAD_WORKERS = 4
+UPLOAD_RETRIES = 3
+
+STREAM_BLOCK_SIZE = 65536
+
+
+def _new_token():
+    return uuid.uuid4().hex
+
+
+def _journal_path(path):
+    return os.path.join(os.path.dirname(path) or '.', '.{}.upload.json'.format(os.path.basename(path)))
+
+
+def _load_journal(path, total_size, chunk_size):
+    try:
+        with open(_journal_path(path)) as f:
+            journal = json.load(f)
+    except (IOError, ValueError):
+        return None
+    stat = os.stat(path)
+    if (journal.get('size') != total_size or journal.get('mtime') != stat.st_mtime
+            or journal.get('chunk_size') != chunk_size):
+        return None
+    return journal
+
+
+class _Journal(object):
+
+    def __init__(self, path, token, total_size, chunk_size, done=()):
+        self.path = path
+        self.state = {
+            'token': token,
+            'size': total_size,
+            'mtime': os.stat(path).st_mtime,
+            'chunk_size': chunk_size,
+            'done': sorted(done),
+        }
+        self._lock = threading.Lock()
+
+    def mark_done(self, chunk):
+        with self._lock:
+            self.state['done'].append(chunk)
+            with open(_journal_path(self.path), 'w') as f:
+                json.dump(self.state, f)
+
+    def remove(self):
+        try:
+            os.remove(_journal_path(self.path))
+        except OSError:
+            pass
+
+
+def _post_chunk(cdsw, data, filename, view, retries):
+    # Sending a chunk again replaces it, so the call can be retried
+    return cdsw.post(cdsw.api + '/upload/admin', expected_codes=[200], data=data, idempotent=True, retries=retries,
+                     files={'file': (filename, view, 'application/zip')})
+
+
+def upload_file(cdsw, path, upload_type='archive', token=None, chunk_size=UPLOAD_CHUNK_SIZE,
+                workers=UPLOAD_WORKERS, retries=UPLOAD_RETRIES):
+    """Uploads ``path`` in flow chunks and returns the uploadToken to reference it.
+
+    If ``token`` is not given and a journal of an earlier interrupted upload of
+    the same file exists, that upload is resumed.
+    """
+    filename = os.path.basename(path)
+    total_size = os.stat(path).st_size
+    total_chunks = max(1, int(math.ceil(total_size / float(chunk_size))))
+
+    journal = _load_journal(path, total_size, chunk_size)
+    if journal and (token is None or token == journal['token']):
+        token = journal['token']
+        done = set(journal['done'])
+        print('Resuming upload {} of {}: {} of {} chunks already sent'.format(
+            token, filename, len(done), total_chunks))
+    else:
+        token = token or _new_token()
+        done = set()
+    journal = _Journal(path, token, total_size, chunk_size, done)
+
+    def chunk_params(chunk, current_size):
+        return {
+            'uploadType': upload_type,
+            'uploadToken': token,
+            'flowChunkNumber': chunk,
+            'flowChunkSize': current_size,
+            'flowCurrentChunkSize': current_size,
+            'flowTotalSize': total_size,
+            'flowIdentifier': token + '-' + filename,
+            'flowFilename': filename,
+            'flowRelativePath': filename,
+            'flowTotalChunks': total_chunks,
+        }
+
+    start = time.time()
+    with open(path, 'rb') as f:
+        if total_size == 0:
+            _post_chunk(cdsw, chunk_params(1, 0), filename, b'', retries)
+            journal.remove()
+            return token
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(mm)
+        try:
+            def send(chunk):
+                offset = (chunk - 1) * chunk_size
+                view = buf[offset:offset + chunk_size]
+                try:
+                    _post_chunk(cdsw, chunk_params(chunk, len(view)), filename, view, retries)
+                finally:
+                    view.release()
+                journal.mark_done(chunk)
+
+            pending = [c for c in range(1, total_chunks + 1) if c not in done]
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                futures = [executor.submit(send, c) for c in pending]
+                try:
+                    for future in futures:
+                        future.result()
+                except Exception:
+                    # The journal keeps the chunks sent so far for the next attempt
+                    for future in futures:
+                        future.cancel()
+                    raise
+        finally:
+            buf.release()
+            mm.close()
+
+    journal.remove()
+    elapsed = time.time() - start
+    print('Uploaded {} ({} bytes, {} chunks) in {:.1f}s'.format(filename, total_size, total_chunks, elapsed))
+    return token
+
+
+class _Progress(object):
+
+    def __init__(self, label, total, step=0.1):
+        self.label = label
+        self.total = total
+        self.step = step
+        self.sent = 0
+        self.start = time.time()
+        self._next_report = step
+
+    def update(self, count):
+        self.sent += count
+        if not self.total or not count:
+            return
+        fraction = self.sent / float(self.total)
+        if fraction >= self._next_report or self.sent == self.total:
+            self._next_report = (int(fraction / self.step) + 1) * self.step
+            self.report()
+
+    def throughput(self):
+        return self.sent / max(time.time() - self.start, 1e-6)
+
+    def report(self):
+        print('{}: {:.0f}% ({} of {} bytes, {:.1f} MB/s)'.format(
+            self.label, 100.0 * self.sent / self.total, self.sent, self.total, self.throughput() / 1048576))
+
+
+class MultipartFileStream(object):
+    """File-like multipart/form-data body with a single file field.
+
+    The file is read in ``STREAM_BLOCK_SIZE`` blocks while requests sends the
+    body, and the total length is known up front so no chunked encoding is
+    needed.
+    """
+
+    def __init__(self, field, path, filename=None, content_type='application/octet-stream'):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary={}'.format(self.boundary)
+        filename = filename or os.path.basename(path)
+        self._head = ('--{}\r\n'
+                      'Content-Disposition: form-data; name="{}"; filename="{}"\r\n'
+                      'Content-Type: {}\r\n\r\n').format(self.boundary, field, filename, content_type).encode('utf-8')
+        self._tail = '\r\n--{}--\r\n'.format(self.boundary).encode('utf-8')
+        self._file = open(path, 'rb')
+        self.len = len(self._head) + os.fstat(self._file.fileno()).st_size + len(self._tail)
+        self._parts = [self._head, None, self._tail]
+        self._progress = _Progress(filename, self.len)
+
+    def __len__(self):
+        return self.len
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.len
+        out = []
+        remaining = size
+        while remaining > 0 and self._parts:
+            part = self._parts[0]
+            if part is None:
+                data = self._file.read(min(remaining, STREAM_BLOCK_SIZE))
+                if not data:
+                    self._parts.pop(0)
+                    continue
+            else:
+                data = part[:remaining]
+                if len(data) == len(part):
+                    self._parts.pop(0)
+                else:
+                    self._parts[0] = part[len(data):]
+            out.append(data)
+            remaining -= len(data)
+        data = b''.join(out)
+        self._progress.update(len(data))
+        return data
+
+    def rewind(self):
+        """Restarts the body from the beginning so a failed request can be retried."""
+        self._file.seek(0)
+        self._parts = [self._head, None, self._tail]
+        self._progress = _Progress(self._progress.label, self.len)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def put_file(cdsw, url, path, field='name', **kwargs):
+    """PUTs ``path`` to ``url`` as a streamed multipart upload with progress reporting."""
+    with MultipartFileStream(field, path) as body:
+        headers = {'Content-Type': body.content_type}
+        headers.update(kwargs.pop('headers', {}))
+        return cdsw.put(url, data=body, headers=headers, **kwargs)
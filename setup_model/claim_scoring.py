@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Scores claim pictures with the deployed models and writes back the results.
+
+Each model of the manifest with a 'claim_column' fills that column of
+car_insurance.claims. For every claim, the model calls go out concurrently on
+one event loop over the keep-alive pools of ``cdsw_async.AsyncCdsw``, so a claim
+takes as long as its slowest model rather than the sum of all of them. When
+the picture detection model finds no car, the pending calls of the
+'requires_car' models are cancelled and their columns set to ``NO_CAR``.
+``concurrency`` claims are in flight at a time.
+
+The input is a JSON lines file with the 'claimId' and either the
+'carImageBased64encoding', a 'carImageRef' into the blob store (see
+``blob_store``) or an 'imageFile' of each claim; claims without a picture
+are skipped. The output of ``claims_loader --output`` is a valid input:
+
+    python claim_scoring.py PUBLIC_IP PWD_FILE claims.jsonl --output scored.jsonl
+    python claim_scoring.py PUBLIC_IP PWD_FILE claims.jsonl --impala-host impalad.example.com
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import blob_store
+import cdsw_async
+import cdsw_setup
+import claims_schema
+import table_sinks
+import tracing
+from deploy_benchmark import percentile
+from model_manifest import MODELS
+
+CLAIMS_TABLE = 'car_insurance.claims'
+IMAGE_REF_TABLE = 'car_insurance.claims_image_refs'
+CLAIM_KEY = 'claimId'
+CAR_COLUMN = 'carDetected'
+NO_CAR = 'no car'
+CONCURRENCY = 8
+
+
+def read_claims(path, store=None):
+    """Yields (claim id, base64 picture) for each claim with a picture in the JSON lines file ``path``."""
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            claim = json.loads(line)
+            if 'carImageBased64encoding' in claim:
+                image = claim['carImageBased64encoding']
+            elif 'carImageRef' in claim:
+                if store is None:
+                    raise RuntimeError('Claim {} refers to a blob but no blob store is given'.format(claim[CLAIM_KEY]))
+                image = claim['carImageRef'] and base64.b64encode(store.get(claim['carImageRef'])).decode('ascii')
+            else:
+                with open(claim['imageFile'], 'rb') as image_file:
+                    image = base64.b64encode(image_file.read()).decode('ascii')
+            if image:
+                yield claim[CLAIM_KEY], image
+
+
+def _column_value(response, column):
+    """Value of ``column`` in a model response, as stored in the (STRING) claims columns."""
+    if isinstance(response, dict) and column in response:
+        response = response[column]
+    elif isinstance(response, dict) and len(response) == 1:
+        response = list(response.values())[0]
+    if isinstance(response, bool):
+        return 'true' if response else 'false'
+    return response if isinstance(response, str) else json.dumps(response)
+
+
+def _is_car(value):
+    return value.lower() in ('true', 'yes', '1', 'car')
+
+
+async def _call(client, access_key, spec, image):
+    start = time.time()
+    try:
+        response = await client.call_model(access_key, {'imageBase64': image})
+    except asyncio.CancelledError:
+        raise
+    except Exception as err:
+        tracing.record('model_call', start, error=str(err), model=spec['name'])
+        raise
+    tracing.record('model_call', start, model=spec['name'])
+    return _column_value(response, spec['claim_column'])
+
+
+async def score_claim(client, access_keys, models, claim_id, image):
+    """Row of the claims table with the model columns of claim ``claim_id``."""
+    calls = dict((spec['claim_column'], asyncio.ensure_future(_call(client, access_keys[spec['name']], spec, image)))
+                 for spec in models)
+    row = {CLAIM_KEY: claim_id}
+    try:
+        has_car = True
+        if CAR_COLUMN in calls:
+            row[CAR_COLUMN] = await calls[CAR_COLUMN]
+            has_car = _is_car(row[CAR_COLUMN])
+        for spec in models:
+            column = spec['claim_column']
+            if column in row:
+                continue
+            if spec.get('requires_car') and not has_car:
+                calls[column].cancel()
+                row[column] = NO_CAR
+            else:
+                row[column] = await calls[column]
+    finally:
+        for call in calls.values():
+            call.cancel()
+        await asyncio.gather(*calls.values(), return_exceptions=True)
+    return row
+
+
+async def score_claims(client, models, claims, sink, concurrency=CONCURRENCY, typed=False):
+    """Scores the (claim id, picture) pairs of ``claims`` and writes the rows to ``sink``.
+
+    With ``typed``, the rows follow the typed schema of ``claims_schema``.
+    Returns the per-claim latencies and the ids of the claims that failed.
+    """
+    models = [spec for spec in models if spec.get('claim_column')]
+    access_keys = dict((m['name'], m['accessKey']) for m in await client.list_models())
+    missing = [spec['name'] for spec in models if spec['name'] not in access_keys]
+    if missing:
+        raise RuntimeError('Models not deployed: {}'.format(', '.join(missing)))
+
+    loop = asyncio.get_event_loop()
+    writer = ThreadPoolExecutor(max_workers=1)
+    claims = iter(claims)
+    latencies = []
+    failures = []
+
+    async def worker():
+        for claim_id, image in claims:
+            start = time.time()
+            try:
+                row = await score_claim(client, access_keys, models, claim_id, image)
+            except Exception as err:
+                print('Claim {} failed: {}'.format(claim_id, err))
+                failures.append(claim_id)
+                continue
+            latencies.append(time.time() - start)
+            if typed:
+                row = claims_schema.typed_row(row)
+            await loop.run_in_executor(writer, sink.write, [row])
+
+    try:
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+    finally:
+        writer.shutdown()
+    return latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score claim pictures with the deployed models.')
+    parser.add_argument('public_ip')
+    parser.add_argument('pwd_file')
+    parser.add_argument('claims', help='JSON lines file of claims')
+    parser.add_argument('--blob-store', help='blob store of the carImageRef pictures (local path or hdfs://)')
+    parser.add_argument('--typed', action='store_true', help='rows of the typed schema (see claims_schema)')
+    parser.add_argument('--output', help='write the rows to this JSON lines file instead of the claims table')
+    parser.add_argument('--impala-host', help='impalad to run the updates on (impala-shell default otherwise)')
+    parser.add_argument('--table', help='default: {}, {} with a blob store'.format(CLAIMS_TABLE, IMAGE_REF_TABLE))
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    args = parser.parse_args()
+    tracing.configure_from_env()
+
+    cdsw = cdsw_setup.Cdsw(args.public_ip, open(args.pwd_file).read())
+    cdsw.init_session()
+    cdsw.authorize()
+    client = cdsw_async.AsyncCdsw.from_cdsw(cdsw, pool_size=args.concurrency * len(MODELS))
+    store = blob_store.open_store(args.blob_store) if args.blob_store else None
+    if args.output:
+        sink = table_sinks.JsonLinesSink(args.output)
+    else:
+        sink = table_sinks.ImpalaShellSink(args.table or (IMAGE_REF_TABLE if store else CLAIMS_TABLE), CLAIM_KEY,
+                                           args.impala_host)
+
+    start = time.time()
+    loop = asyncio.get_event_loop()
+    try:
+        latencies, failures = loop.run_until_complete(
+            score_claims(client, MODELS, read_claims(args.claims, store), sink, args.concurrency, args.typed))
+    finally:
+        client.close()
+        sink.close()
+        tracing.flush()
+    elapsed = time.time() - start
+    print('Scored {} claims ({} failed) in {:.1f}s: {:.1f} claims/s, latency p50 {:.3f}s, p95 {:.3f}s'.format(
+        len(latencies), len(failures), elapsed, len(latencies) / elapsed if elapsed else 0.0,
+        percentile(latencies, 50), percentile(latencies, 95)))
+    if failures:
+        raise RuntimeError('Scoring failed for claims: {}'.format(', '.join(str(c) for c in failures)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Streaming load of the claims and customers CSVs into car_insurance.claims.
+
+The customer ids are read first (customers are few compared with claims).
+Then the claims file is streamed in batches of ``batch_rows`` rows: each claim
+is joined to its customer, and claims of unknown customers are rejected. The
+rows are inserted through a sink (see ``table_sinks``): Kudu skips the claims
+already in the table, so a rerun only adds new claims and keeps the scores,
+position and picture of the existing ones. A reader thread parses the next
+batches while the current one is written, with at most ``QUEUE_BATCHES``
+batches in memory, so memory stays bounded whatever the size of the files.
+
+The CSVs carry no picture or position: the picture is read from
+``<images dir>/<claim id>.jpg`` when an images directory is given, and the
+position and model columns get placeholders until the claims are scored (see
+``claim_scoring``). With a blob store, the picture goes to the store and the
+row only carries its reference; the rows then go to the table of
+create_table_image_refs.sql. The pictures of a batch are flushed to the store
+before the batch is written, so a row never refers to a missing blob.
+With ``--typed``, the rows follow the typed schema of ``claims_schema``.
+
+    python claims_loader.py data/claims.csv data/customers.csv
+    python claims_loader.py data/claims.csv data/customers.csv --output /tmp/claims.jsonl
+    python claims_loader.py data/claims.csv data/customers.csv --images-dir pics --blob-store hdfs:///tmp/claim-images
+"""
+
+import argparse
+import base64
+import csv
+import datetime
+import os
+import queue
+import threading
+import time
+
+import blob_store
+import claims_schema
+import table_sinks
+
+CLAIMS_TABLE = 'car_insurance.claims'
+IMAGE_REF_TABLE = 'car_insurance.claims_image_refs'
+CLAIM_KEY = 'claimId'
+# The CSVs have no header line
+CLAIM_FIELDS = ['id', 'date', 'code', 'customerId', 'number']
+CUSTOMER_FIELDS = ['id', 'VIN', 'first', 'last', 'city', 'address', 'make']
+COLUMNS = ['claimId', 'carImageBased64encoding', 'clainDate', 'customerId', 'latitude', 'longitude',
+           'carDetected', 'severity', 'localization', 'isDamaged']
+IMAGE_REF_COLUMNS = ['claimId', 'carImageRef', 'carImageBytes', 'clainDate', 'customerId', 'latitude', 'longitude',
+                     'carDetected', 'severity', 'localization', 'isDamaged']
+PENDING = claims_schema.PENDING
+
+BATCH_ROWS = 5000
+QUEUE_BATCHES = 4
+REPORT_SECONDS = 5.0
+
+
+def read_customer_ids(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return set(row['id'] for row in csv.DictReader(f, fieldnames=CUSTOMER_FIELDS))
+
+
+def _picture(images_dir, claim_id):
+    if not images_dir:
+        return b''
+    path = os.path.join(images_dir, '{}.jpg'.format(claim_id))
+    if not os.path.exists(path):
+        return b''
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def claim_row(claim, images_dir=None, store=None):
+    """Row of the claims table for ``claim``; with a blob ``store``, a row of the image reference schema."""
+    picture = _picture(images_dir, claim['id'])
+    if store is None:
+        row = {'carImageBased64encoding': base64.b64encode(picture).decode('ascii')}
+    else:
+        row = {'carImageRef': store.put(picture) if picture else '', 'carImageBytes': len(picture)}
+    row.update({
+        'claimId': claim['id'],
+        'clainDate': datetime.datetime.strptime(claim['date'], '%Y-%m-%d %H:%M:%S'),
+        'customerId': claim['customerId'],
+        'latitude': 0.0,
+        'longitude': 0.0,
+        'carDetected': PENDING,
+        'severity': PENDING,
+        'localization': PENDING,
+        'isDamaged': PENDING,
+    })
+    return row
+
+
+def read_batches(claims_path, customer_ids, batch_rows=BATCH_ROWS, images_dir=None, rejected=None, store=None,
+                 typed=False):
+    """Yields lists of at most ``batch_rows`` claim rows; ids of rejected claims go to ``rejected``."""
+    batch = []
+    with open(claims_path, newline='', encoding='utf-8') as f:
+        for claim in csv.DictReader(f, fieldnames=CLAIM_FIELDS):
+            if claim['customerId'] not in customer_ids:
+                if rejected is not None:
+                    rejected.append(claim['id'])
+                continue
+            row = claim_row(claim, images_dir, store)
+            batch.append(claims_schema.typed_row(row) if typed else row)
+            if len(batch) >= batch_rows:
+                if store is not None:
+                    store.flush()
+                yield batch
+                batch = []
+    if batch:
+        if store is not None:
+            store.flush()
+        yield batch
+
+
+class _Progress(object):
+
+    def __init__(self, report_seconds=REPORT_SECONDS):
+        self.start = time.time()
+        self.rows = 0
+        self.report_seconds = report_seconds
+        self._reported = self.start
+
+    def add(self, rows):
+        self.rows += rows
+        now = time.time()
+        if now - self._reported >= self.report_seconds:
+            self._reported = now
+            print('Loaded {} rows ({:.0f} rows/s)'.format(self.rows, self.rate()))
+
+    def rate(self):
+        elapsed = time.time() - self.start
+        return self.rows / elapsed if elapsed else 0.0
+
+
+def load(claims_path, customers_path, sink, batch_rows=BATCH_ROWS, images_dir=None, store=None, typed=False):
+    """Loads the claims of ``claims_path`` into ``sink``; returns (rows loaded, rejected claim ids, rows/s)."""
+    customer_ids = read_customer_ids(customers_path)
+    rejected = []
+    batches = queue.Queue(maxsize=QUEUE_BATCHES)
+    errors = []
+
+    def read():
+        try:
+            for batch in read_batches(claims_path, customer_ids, batch_rows, images_dir, rejected, store, typed):
+                batches.put(batch)
+        except Exception as err:
+            errors.append(err)
+        finally:
+            batches.put(None)
+
+    reader = threading.Thread(target=read, name='claims-reader')
+    reader.daemon = True
+    reader.start()
+    progress = _Progress()
+    while True:
+        batch = batches.get()
+        if batch is None:
+            break
+        sink.write(batch)
+        progress.add(len(batch))
+    sink.close()
+    reader.join()
+    if errors:
+        raise errors[0]
+    return progress.rows, rejected, progress.rate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load the claims CSVs into the Kudu claims table.')
+    parser.add_argument('claims_csv')
+    parser.add_argument('customers_csv')
+    parser.add_argument('--images-dir', help='directory with a <claim id>.jpg picture per claim')
+    parser.add_argument('--blob-store', help='store the pictures here (local path or hdfs://) and load references')
+    parser.add_argument('--typed', action='store_true', help='rows of the typed schema (see claims_schema)')
+    parser.add_argument('--output', help='write the rows to this JSON lines file instead of the claims table')
+    parser.add_argument('--impala-host', help='impalad to run the inserts on (impala-shell default otherwise)')
+    parser.add_argument('--table', help='default: {}, {} with a blob store'.format(CLAIMS_TABLE, IMAGE_REF_TABLE))
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS)
+    args = parser.parse_args()
+
+    store = blob_store.open_store(args.blob_store) if args.blob_store else None
+    table = args.table or (IMAGE_REF_TABLE if store else CLAIMS_TABLE)
+    if args.output:
+        sink = table_sinks.JsonLinesSink(args.output)
+    else:
+        sink = table_sinks.ImpalaShellSink(table, CLAIM_KEY, args.impala_host, batch_rows=args.batch_rows,
+                                           mode='insert', columns=IMAGE_REF_COLUMNS if store else COLUMNS)
+    rows, rejected, rate = load(args.claims_csv, args.customers_csv, sink, args.batch_rows, args.images_dir, store,
+                                args.typed)
+    print('Loaded {} rows into {} ({:.0f} rows/s), rejected {} claims of unknown customers'.format(
+        rows, args.output or table, rate, len(rejected)))
+
+
+if __name__ == '__main__':
+    main()
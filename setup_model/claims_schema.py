@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""DDL of the partitioned, typed car_insurance.claims table and migration to it.
+
+Compared with create_table.sql, the generated table:
+
+* is hash partitioned on claimId (``hash_buckets`` buckets, for write
+  throughput) and range partitioned on clainDate (one range per year, quarter
+  or month, plus open-ended ranges before and after), so a date-bounded query
+  only scans the tablets of its ranges. Kudu requires range partition columns
+  in the primary key, so the key becomes (claimId, clainDate);
+* types the model columns: carDetected and isDamaged are BOOLEAN, severity and
+  localization are dictionary-encoded strings (Kudu has no enum type), and all
+  four are NULL until the claim is scored; latitude/longitude are
+  DECIMAL(9,6) (about 0.1 m);
+* sets encodings and compression per column.
+
+The date ranges run up to the end of ``last_year``, next year by default.
+
+The migration has two scripts. ``copy_sql()`` creates the new table next to
+the current one as ``<table>_partitioned``, copies and converts the rows, and
+ends with the row counts of both tables. ``swap_sql()`` then swaps the names,
+keeping the current table as ``<table>_old`` until it is dropped by hand. The
+swap is a manual step: run it only once ``counts_match`` is true, with the
+loaders stopped so that no new claim is missed:
+
+    python claims_schema.py create --hash-buckets 16 --granularity quarter > create_table_partitioned.sql
+    python claims_schema.py copy --hash-buckets 16 > copy_claims.sql
+    impala-shell -f copy_claims.sql
+    python claims_schema.py swap > swap_claims.sql
+    impala-shell -f swap_claims.sql
+"""
+
+import argparse
+import datetime
+import decimal
+
+CLAIMS_TABLE = 'car_insurance.claims'
+IMAGE_REF_TABLE = 'car_insurance.claims_image_refs'
+HASH_BUCKETS = 8
+GRANULARITY = 'year'
+FIRST_YEAR = 2020
+PENDING = 'pending'
+
+_TRUE = ('true', 'yes', '1', 'car')
+_FALSE = ('false', 'no', '0')
+_COORDINATE = decimal.Decimal('0.000001')
+
+# (name, type, nullable, encoding, compression)
+_KEY_COLUMNS = [
+    ('claimId', 'STRING', False, 'PREFIX_ENCODING', 'LZ4'),
+    ('clainDate', 'TIMESTAMP', False, 'BIT_SHUFFLE', None),
+]
+_IMAGE_COLUMNS = [
+    ('carImageBased64encoding', 'STRING', False, 'PLAIN_ENCODING', 'LZ4'),
+]
+_IMAGE_REF_COLUMNS = [
+    ('carImageRef', 'STRING', False, 'PLAIN_ENCODING', 'LZ4'),
+    ('carImageBytes', 'BIGINT', False, 'BIT_SHUFFLE', None),
+]
+_VALUE_COLUMNS = [
+    ('customerId', 'STRING', False, 'DICT_ENCODING', None),
+    ('latitude', 'DECIMAL(9,6)', False, 'BIT_SHUFFLE', None),
+    ('longitude', 'DECIMAL(9,6)', False, 'BIT_SHUFFLE', None),
+    ('carDetected', 'BOOLEAN', True, 'RLE', None),
+    ('severity', 'STRING', True, 'DICT_ENCODING', None),
+    ('localization', 'STRING', True, 'DICT_ENCODING', None),
+    ('isDamaged', 'BOOLEAN', True, 'RLE', None),
+]
+BOOLEAN_COLUMNS = ['carDetected', 'isDamaged']
+ENUM_COLUMNS = ['severity', 'localization']
+COORDINATE_COLUMNS = ['latitude', 'longitude']
+
+
+def columns(image_refs=False):
+    return _KEY_COLUMNS + (_IMAGE_REF_COLUMNS if image_refs else _IMAGE_COLUMNS) + _VALUE_COLUMNS
+
+
+def _column_sql(name, type_, nullable, encoding, compression):
+    sql = '{} {} {}'.format(name, type_, 'NULL' if nullable else 'NOT NULL')
+    if encoding:
+        sql += ' ENCODING {}'.format(encoding)
+    if compression:
+        sql += ' COMPRESSION {}'.format(compression)
+    return sql
+
+
+def default_last_year():
+    """Last year with its own date range by default: next year, so the claims of the coming months fit."""
+    return datetime.date.today().year + 1
+
+
+def _range_starts(granularity, first_year, last_year):
+    if last_year is None:
+        last_year = default_last_year()
+    months = {'year': 12, 'quarter': 3, 'month': 1}[granularity]
+    starts = []
+    for year in range(first_year, last_year + 1):
+        for month in range(1, 13, months):
+            starts.append(datetime.date(year, month, 1))
+    return starts + [datetime.date(last_year + 1, 1, 1)]
+
+
+def _timestamp(day):
+    return "CAST('{}' AS TIMESTAMP)".format(day.isoformat())
+
+
+def range_partitions_sql(granularity=GRANULARITY, first_year=FIRST_YEAR, last_year=None):
+    bounds = _range_starts(granularity, first_year, last_year)
+    partitions = ['PARTITION VALUES < {}'.format(_timestamp(bounds[0]))]
+    partitions += ['PARTITION {} <= VALUES < {}'.format(_timestamp(low), _timestamp(high))
+                   for low, high in zip(bounds, bounds[1:])]
+    partitions.append('PARTITION {} <= VALUES'.format(_timestamp(bounds[-1])))
+    return partitions
+
+
+def tablet_count(hash_buckets=HASH_BUCKETS, granularity=GRANULARITY, first_year=FIRST_YEAR, last_year=None):
+    return hash_buckets * len(range_partitions_sql(granularity, first_year, last_year))
+
+
+def create_table_sql(table=CLAIMS_TABLE, hash_buckets=HASH_BUCKETS, granularity=GRANULARITY,
+                     first_year=FIRST_YEAR, last_year=None, image_refs=False):
+    database = table.split('.')[0]
+    lines = ['create database IF NOT EXISTS {};'.format(database), '',
+             '-- {} tablets: {} hash buckets x {} date ranges'.format(
+                 tablet_count(hash_buckets, granularity, first_year, last_year), hash_buckets,
+                 len(range_partitions_sql(granularity, first_year, last_year))),
+             'CREATE TABLE IF NOT EXISTS {} ('.format(table)]
+    lines += ['{},'.format(_column_sql(*column)) for column in columns(image_refs)]
+    lines += ['PRIMARY KEY (claimId, clainDate))',
+              'PARTITION BY HASH (claimId) PARTITIONS {},'.format(hash_buckets),
+              'RANGE (clainDate) (',
+              ',\n'.join('  ' + p for p in range_partitions_sql(granularity, first_year, last_year)),
+              ')',
+              'STORED AS KUDU;']
+    return '\n'.join(lines) + '\n'
+
+
+def _boolean_sql(column):
+    return ("CASE WHEN lower({0}) IN ({1}) THEN true WHEN lower({0}) IN ({2}) THEN false ELSE NULL END".format(
+        column, ', '.join("'{}'".format(v) for v in _TRUE), ', '.join("'{}'".format(v) for v in _FALSE)))
+
+
+def _select_sql(name, type_):
+    if name in BOOLEAN_COLUMNS:
+        return _boolean_sql(name)
+    if name in ENUM_COLUMNS:
+        return "NULLIF(NULLIF({}, '{}'), '')".format(name, PENDING)
+    if name in COORDINATE_COLUMNS:
+        return 'CAST({} AS {})'.format(name, type_)
+    return name
+
+
+def copy_sql(table=CLAIMS_TABLE, hash_buckets=HASH_BUCKETS, granularity=GRANULARITY,
+             first_year=FIRST_YEAR, last_year=None, image_refs=False):
+    """Statements copying ``table`` (string schema of create_table.sql) to a new partitioned, typed table."""
+    new_table = table + '_partitioned'
+    new_columns = columns(image_refs)
+    select = ',\n  '.join(_select_sql(name, type_) for name, type_, _, _, _ in new_columns)
+    return '\n'.join([
+        '-- 1. Create the new table next to {}'.format(table),
+        create_table_sql(new_table, hash_buckets, granularity, first_year, last_year, image_refs),
+        '-- 2. Copy and convert the rows (UPSERT: safe to run again)',
+        'UPSERT INTO {} ({})'.format(new_table, ', '.join(c[0] for c in new_columns)),
+        'SELECT\n  {}\nFROM {};'.format(select, table),
+        '',
+        '-- 3. counts_match must be true before running the swap script',
+        'SELECT src.n AS current_rows, dst.n AS copied_rows, src.n = dst.n AS counts_match',
+        'FROM (SELECT count(*) AS n FROM {}) src'.format(table),
+        'CROSS JOIN (SELECT count(*) AS n FROM {}) dst;'.format(new_table),
+    ]) + '\n'
+
+
+def swap_sql(table=CLAIMS_TABLE):
+    """Statements giving the copy made by ``copy_sql()`` the name of ``table``."""
+    return '\n'.join([
+        '-- Run only once the copy script reported counts_match = true',
+        '-- Swap the names; drop {}_old once the new table is validated'.format(table),
+        'ALTER TABLE {0} RENAME TO {0}_old;'.format(table),
+        'ALTER TABLE {0}_partitioned RENAME TO {0};'.format(table),
+    ]) + '\n'
+
+
+def _boolean(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    value = str(value).lower()
+    return True if value in _TRUE else False if value in _FALSE else None
+
+
+def typed_row(row):
+    """``row`` (string model columns, as in create_table.sql) converted to the typed schema."""
+    typed = dict(row)
+    for column in BOOLEAN_COLUMNS:
+        if column in typed:
+            typed[column] = _boolean(typed[column])
+    for column in ENUM_COLUMNS:
+        if typed.get(column) in (PENDING, ''):
+            typed[column] = None
+    for column in COORDINATE_COLUMNS:
+        if column in typed:
+            typed[column] = decimal.Decimal(str(typed[column])).quantize(_COORDINATE)
+    return typed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate the DDL of the partitioned, typed claims table.')
+    parser.add_argument('action', choices=['create', 'copy', 'swap'])
+    parser.add_argument('--table', help='default: {}, {} with --image-refs'.format(CLAIMS_TABLE, IMAGE_REF_TABLE))
+    parser.add_argument('--hash-buckets', type=int, default=HASH_BUCKETS)
+    parser.add_argument('--granularity', choices=['year', 'quarter', 'month'], default=GRANULARITY)
+    parser.add_argument('--first-year', type=int, default=FIRST_YEAR)
+    parser.add_argument('--last-year', type=int, help='last year with its own date range (default: next year)')
+    parser.add_argument('--image-refs', action='store_true', help='schema of create_table_image_refs.sql')
+    args = parser.parse_args()
+
+    table = args.table or (IMAGE_REF_TABLE if args.image_refs else CLAIMS_TABLE)
+    if args.action == 'swap':
+        print(swap_sql(table), end='')
+        return
+    generate = create_table_sql if args.action == 'create' else copy_sql
+    print(generate(table, args.hash_buckets, args.granularity, args.first_year, args.last_year,
+                   args.image_refs), end='')
+
+
+if __name__ == '__main__':
+    main()
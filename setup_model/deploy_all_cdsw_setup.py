@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import artifact_digests
+import cdsw_setup
+import tracing
+from model_manifest import MODELS
+
+
+def _project_zip_file(resource_dir, spec):
+    # A <project name>.zip next to the model files selects a local project instead of GitHub
+    zip_file = os.path.join(resource_dir, spec['project_name'] + '.zip')
+    return zip_file if os.path.exists(zip_file) else None
+
+
+def _deploy(cdsw, spec, resource_dir, digests):
+    start = time.time()
+    cdsw_setup.deploy_model(cdsw, spec, os.path.join(resource_dir, spec['model_file']),
+                            _project_zip_file(resource_dir, spec), digests)
+    return time.time() - start
+
+
+def deploy_all(cdsw, models, resource_dir, digests=None, timings=None, trace=True):
+    """Prepares the cluster and deploys ``models`` concurrently; returns the names of the failed ones.
+
+    ``timings``, if given, gets the seconds taken by 'prepare' and by each deployed model.
+    """
+    if trace:
+        tracing.new_trace()
+    if timings is None:
+        timings = {}
+    start = time.time()
+    cdsw_setup.prepare(cdsw, models)
+    timings['prepare'] = time.time() - start
+
+    if digests is None:
+        digests = artifact_digests.DigestManifest()
+    print('# Deploy {} models concurrently'.format(len(models)))
+    start = time.time()
+    failures = []
+    with ThreadPoolExecutor(max_workers=len(models)) as executor:
+        futures = [(spec, executor.submit(_deploy, cdsw, spec, resource_dir, digests)) for spec in models]
+        for spec, future in futures:
+            try:
+                timings[spec['name']] = future.result()
+                print('# Model {} ready in {:.1f}s'.format(spec['name'], timings[spec['name']]))
+            except Exception as err:
+                print('# Model {} failed: {}'.format(spec['name'], err))
+                failures.append(spec['name'])
+
+    print('# All deployments finished in {:.1f}s'.format(time.time() - start))
+    return failures
+
+
+def main():
+    public_ip = sys.argv[1]
+    resource_dir = sys.argv[2]
+    password = open(sys.argv[3]).read() if len(sys.argv) > 3 else os.environ['THE_PWD']
+    tracing.configure_from_env()
+
+    cdsw = cdsw_setup.Cdsw(public_ip, password)
+    print('BASE_DIR:       {}'.format(cdsw_setup.BASE_DIR))
+    print('CDSW_ALTUS_API: {}'.format(cdsw.altus_api))
+    print('CDSW_API:       {}'.format(cdsw.api))
+    print('IS_TLS_ENABLED: {}'.format(cdsw_setup._IS_TLS_ENABLED))
+    print('RESOURCE_DIR:   {}'.format(resource_dir))
+    print('PUBLIC_IP:      {}'.format(public_ip))
+    print('TRUSTSTORE:     {}'.format(cdsw_setup.TRUSTSTORE))
+    print('MODELS:         {}'.format(', '.join(spec['name'] for spec in MODELS)))
+    print('TRACE_FILE:     {}'.format(os.environ.get('CDSW_TRACE_FILE', '')))
+    print('-------------------------------------------------------')
+
+    try:
+        failures = deploy_all(cdsw, MODELS, resource_dir)
+    finally:
+        tracing.flush()
+    if failures:
+        raise RuntimeError('Deployment failed for: {}'.format(', '.join(failures)))
+    print('# CDSW setup completed successfully!')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark of the CDSW deploy pipeline, phase by phase.
+
+Runs the full deployment of the model manifest N times, either against a
+fresh in-process fake_cdsw server per run (the default) or against a real
+cluster or an already running fake (``--url``), and reports p50/p95/max per
+phase plus requests, uploaded bytes and wait-loop idle time per run:
+
+    python deploy_benchmark.py --runs 5 --artifact-mb 20 --latency 0.02
+    python deploy_benchmark.py --runs 3 --url http://cdsw.10.0.0.1.nip.io --resource-dir /tmp/resource
+
+The text report has a fixed layout (one row per phase, always in the same
+order) so reports of two releases can be diffed; ``--json`` writes the same
+numbers as JSON. A run that raises is recorded with its error and duration,
+counted as failed and left out of the per-run numbers; the benchmark goes on
+with the next run. Phase timings and request counts come from the ``tracing``
+spans; set ``CDSW_TRACE_FILE`` to also keep the raw spans.
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import cdsw_setup
+import deploy_all_cdsw_setup
+import fake_cdsw
+import local_state
+import polling
+import tracing
+from model_manifest import MODELS
+
+# Span names of the deploy phases (see cdsw_setup), in pipeline order. Phases nest,
+# so model_create includes its engine_image lookup.
+PHASES = [
+    'create_user',
+    'authenticate',
+    'runtime_discovery',
+    'prepare',
+    'project_creation',
+    'artifact_upload',
+    'setup_job',
+    'engine_image',
+    'model_create',
+    'model_rebuild',
+    'model_wait',
+    'batch_model',
+    'model_deploy',
+]
+
+RUN_METRICS = ['run_seconds', 'requests', 'bytes_sent', 'retries', 'idle_seconds', 'polls']
+
+
+class _Recorder(object):
+    """Tracing listener aggregating the finished spans of one run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.requests = 0
+        self.bytes_sent = 0
+        self.retries = 0
+
+    def __call__(self, span):
+        with self._lock:
+            if span.name == 'http':
+                self.requests += 1
+                self.bytes_sent += span.attributes.get('request_bytes', 0)
+                self.retries += span.attributes.get('retries', 0)
+            elif span.name in PHASES:
+                self.samples.setdefault(span.name, []).append(span.duration)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values``."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(math.ceil(pct / 100.0 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def _summary(values):
+    return {'samples': len(values), 'p50': percentile(values, 50), 'p95': percentile(values, 95),
+            'max': max(values) if values else 0.0}
+
+
+def _make_artifacts(directory, size_mb):
+    for spec in MODELS:
+        path = os.path.join(directory, spec['model_file'])
+        with open(path, 'wb') as f:
+            remaining = int(size_mb * 1048576)
+            while remaining > 0:
+                block = os.urandom(min(remaining, 1048576))
+                f.write(block)
+                remaining -= len(block)
+
+
+def _stop(server):
+    server.shutdown()
+    server.server_close()
+
+
+def _run_once(args, url, resource_dir, state_dir):
+    local_state.STATE_DIR = state_dir
+    polling.reset_stats()
+    recorder = _Recorder()
+    remove_listener = tracing.add_listener(recorder)
+    start = time.time()
+    failures = []
+    error = None
+    out = sys.stdout if args.verbose else open(os.devnull, 'w')
+    try:
+        with contextlib.redirect_stdout(out):
+            cdsw = cdsw_setup.Cdsw(url, args.password)
+            failures = deploy_all_cdsw_setup.deploy_all(cdsw, MODELS, resource_dir)
+    except Exception as err:
+        error = '{}: {}'.format(type(err).__name__, err)
+    finally:
+        remove_listener()
+        if out is not sys.stdout:
+            out.close()
+    idle = polling.stats()
+    return {
+        'phases': recorder.samples,
+        'failures': failures,
+        'error': error,
+        'run_seconds': time.time() - start,
+        'requests': recorder.requests,
+        'bytes_sent': recorder.bytes_sent,
+        'retries': recorder.retries,
+        'idle_seconds': idle['idle_seconds'],
+        'polls': idle['polls'],
+    }
+
+
+def run_benchmark(args):
+    work_dir = tempfile.mkdtemp(prefix='cdsw-bench-')
+    try:
+        resource_dir = args.resource_dir
+        if not resource_dir:
+            resource_dir = os.path.join(work_dir, 'resource')
+            os.makedirs(resource_dir)
+            _make_artifacts(resource_dir, args.artifact_mb)
+        fake_config = fake_cdsw.FakeCdswConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                               job_seconds=args.job_seconds, build_seconds=args.build_seconds,
+                                               deploy_seconds=args.deploy_seconds)
+        # A warm benchmark keeps both the local state and the (fake) cluster between runs
+        shared_server = fake_cdsw.start_in_thread(fake_config) if args.warm and not args.url else None
+        runs = []
+        for i in range(args.runs):
+            state_dir = os.path.join(work_dir, 'state' if args.warm else 'state-{}'.format(i))
+            server = shared_server or (None if args.url else fake_cdsw.start_in_thread(fake_config))
+            try:
+                result = _run_once(args, args.url or server.url, resource_dir, state_dir)
+            finally:
+                if server and server is not shared_server:
+                    _stop(server)
+            print('run {}/{}: {:.2f}s, {} requests, {} failures{}'.format(
+                i + 1, args.runs, result['run_seconds'], result['requests'], len(result['failures']),
+                ', failed: {}'.format(result['error']) if result['error'] else ''), file=sys.stderr)
+            runs.append(result)
+        if shared_server:
+            _stop(shared_server)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    completed = [r for r in runs if not r['error']]
+    report = {'runs': args.runs, 'target': args.url or 'fake', 'models': len(MODELS), 'phases': {},
+              'per_run': {}, 'failures': sum(len(r['failures']) for r in runs),
+              'failed_runs': [{'run': i + 1, 'error': r['error'], 'run_seconds': r['run_seconds']}
+                              for i, r in enumerate(runs) if r['error']]}
+    for phase in PHASES:
+        report['phases'][phase] = _summary([s for r in runs for s in r['phases'].get(phase, [])])
+    for metric in RUN_METRICS:
+        report['per_run'][metric] = _summary([r[metric] for r in completed])
+    return report
+
+
+def format_report(report):
+    lines = ['# deploy benchmark: runs={} target={} models={} failures={} failed_runs={}'.format(
+        report['runs'], report['target'], report['models'], report['failures'], len(report['failed_runs'])),
+        '{:<20} {:>8} {:>10} {:>10} {:>10}'.format('phase', 'samples', 'p50_s', 'p95_s', 'max_s')]
+    for phase in PHASES:
+        s = report['phases'][phase]
+        lines.append('{:<20} {:>8} {:>10.3f} {:>10.3f} {:>10.3f}'.format(phase, s['samples'], s['p50'], s['p95'],
+                                                                       s['max']))
+    lines.append('{:<20} {:>8} {:>10} {:>10} {:>10}'.format('per_run', 'samples', 'p50', 'p95', 'max'))
+    for metric in RUN_METRICS:
+        s = report['per_run'][metric]
+        lines.append('{:<20} {:>8} {:>10.3f} {:>10.3f} {:>10.3f}'.format(metric, s['samples'], s['p50'], s['p95'],
+                                                                       s['max']))
+    for failed in report['failed_runs']:
+        lines.append('failed run {:<9} {:>8.3f}s  {}'.format(failed['run'], failed['run_seconds'], failed['error']))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-phase latency benchmark of the CDSW deploy pipeline.')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--url', help='cluster base URL or public IP; default starts a local fake per run')
+    parser.add_argument('--password', default='supersecret1')
+    parser.add_argument('--resource-dir', help='directory with the model files; default generates random ones')
+    parser.add_argument('--artifact-mb', type=float, default=1.0, help='size of each generated model file')
+    parser.add_argument('--warm', action='store_true', help='keep local state between runs (no-op redeploys)')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--job-seconds', type=float, default=1.0)
+    parser.add_argument('--build-seconds', type=float, default=2.0)
+    parser.add_argument('--deploy-seconds', type=float, default=1.0)
+    parser.add_argument('--json', help='also write the report as JSON to this file')
+    parser.add_argument('--verbose', action='store_true', help='show the deploy output')
+    args = parser.parse_args()
+
+    tracing.configure_from_env()
+    try:
+        report = run_benchmark(args)
+    finally:
+        tracing.flush()
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Deployment of the model manifest to a fleet of CDSW clusters.
+
+Takes a file with one cluster per line (public IP or base URL, optionally
+followed by the path of that cluster's password file; ``#`` starts a comment)
+and runs ``deploy_all_cdsw_setup.deploy_all`` on at most ``--concurrency``
+clusters at a time. Each cluster has its own ``Cdsw`` connection (session,
+caches, token), and a failing cluster does not stop the others; with
+``--max-failures``, no new cluster is started once that many have failed.
+Local state (uploaded artifact digests, deployment checkpoints, runtime
+catalog) is shared by the clusters and keyed by cluster, so a rerun of the fleet resumes every cluster where it
+stopped.
+
+Progress goes to stderr as clusters finish; the final report gives the status,
+duration, prepare time, slowest model and REST calls of every cluster, and
+p50/p95/max across the fleet:
+
+    python deploy_fleet.py clusters.txt /tmp/resource /tmp/resource/the_pwd.txt --concurrency 4
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import artifact_digests
+import cdsw_setup
+import deploy_all_cdsw_setup
+import deploy_state
+import runtime_catalog
+import tracing
+from deploy_benchmark import percentile
+from model_manifest import MODELS
+
+CONCURRENCY = 4
+
+
+def read_clusters(path, default_password_file):
+    """[(endpoint, password file)] of the cluster list ``path``."""
+    clusters = []
+    with open(path) as f:
+        for line in f:
+            fields = line.split('#', 1)[0].split()
+            if fields:
+                clusters.append((fields[0], fields[1] if len(fields) > 1 else default_password_file))
+    return clusters
+
+
+class _RequestCounter(object):
+    """Tracing listener counting the REST calls and retries of each cluster."""
+
+    def __init__(self, clusters):
+        self._lock = threading.Lock()
+        self._urls = dict((cdsw_setup.cluster_url(endpoint) + '/', endpoint) for endpoint, _ in clusters)
+        self.requests = {}
+        self.retries = {}
+
+    def __call__(self, span):
+        if span.name != 'http':
+            return
+        for prefix, endpoint in self._urls.items():
+            if span.attributes.get('url', '').startswith(prefix):
+                with self._lock:
+                    self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+                    self.retries[endpoint] = self.retries.get(endpoint, 0) + span.attributes.get('retries', 0)
+                return
+
+
+def _deploy_cluster(endpoint, password_file, models, resource_dir, digests, state, runtimes):
+    start = time.time()
+    timings = {}
+    result = {'cluster': endpoint, 'failures': [], 'error': None}
+    try:
+        with open(password_file) as f:
+            password = f.read()
+        cdsw = cdsw_setup.Cdsw(endpoint, password, runtimes=runtimes, state=state)
+        result['failures'] = deploy_all_cdsw_setup.deploy_all(cdsw, models, resource_dir, digests, timings,
+                                                              trace=False)
+    except Exception as err:
+        result['error'] = '{}: {}'.format(type(err).__name__, err)
+    model_seconds = dict((name, seconds) for name, seconds in timings.items() if name != 'prepare')
+    slowest = max(model_seconds, key=model_seconds.get) if model_seconds else None
+    result.update({
+        'status': 'failed' if result['error'] or result['failures'] else 'ok',
+        'seconds': time.time() - start,
+        'prepare_seconds': timings.get('prepare'),
+        'model_seconds': model_seconds,
+        'slowest_model': slowest,
+    })
+    return result
+
+
+def deploy_fleet(clusters, models, resource_dir, concurrency=CONCURRENCY, max_failures=None, verbose=False):
+    """Deploys ``models`` to ``clusters`` ([(endpoint, password file)]); returns the per-cluster results."""
+    tracing.new_trace()
+    digests = artifact_digests.DigestManifest()
+    state = deploy_state.DeployState()
+    runtimes = runtime_catalog.RuntimeCatalog()
+    counter = _RequestCounter(clusters)
+    remove_listener = tracing.add_listener(counter)
+    lock = threading.Lock()
+    results = []
+
+    def run(endpoint, password_file):
+        with lock:
+            failed = sum(1 for r in results if r['status'] != 'ok')
+            if max_failures is not None and failed >= max_failures:
+                result = {'cluster': endpoint, 'status': 'skipped', 'error': None, 'failures': [],
+                          'seconds': 0.0, 'prepare_seconds': None, 'model_seconds': {}, 'slowest_model': None}
+                results.append(result)
+                return result
+        result = _deploy_cluster(endpoint, password_file, models, resource_dir, digests, state, runtimes)
+        with lock:
+            results.append(result)
+            print('# [{}/{}] {}: {} in {:.1f}s{}'.format(
+                len(results), len(clusters), endpoint, result['status'], result['seconds'],
+                ' ({})'.format(result['error'] or ', '.join(result['failures'])) if result['status'] != 'ok' else ''),
+                file=sys.stderr)
+        return result
+
+    out = sys.stdout if verbose else open(os.devnull, 'w')
+    try:
+        with contextlib.redirect_stdout(out), ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(run, endpoint, password_file) for endpoint, password_file in clusters]
+            ordered = [future.result() for future in futures]
+    finally:
+        remove_listener()
+        if out is not sys.stdout:
+            out.close()
+    for result in ordered:
+        result['requests'] = counter.requests.get(result['cluster'], 0)
+        result['retries'] = counter.retries.get(result['cluster'], 0)
+    return ordered
+
+
+def _summary(values):
+    return {'p50': percentile(values, 50), 'p95': percentile(values, 95), 'max': max(values) if values else 0.0}
+
+
+def fleet_report(results):
+    deployed = [r for r in results if r['status'] == 'ok']
+    return {
+        'clusters': results,
+        'ok': len(deployed),
+        'failed': sum(1 for r in results if r['status'] == 'failed'),
+        'skipped': sum(1 for r in results if r['status'] == 'skipped'),
+        'cluster_seconds': _summary([r['seconds'] for r in deployed]),
+        'prepare_seconds': _summary([r['prepare_seconds'] for r in deployed]),
+        'model_seconds': _summary([s for r in deployed for s in r['model_seconds'].values()]),
+    }
+
+
+def format_report(report):
+    lines = ['# fleet deploy: ok={} failed={} skipped={}'.format(report['ok'], report['failed'], report['skipped']),
+             '{:<40} {:>8} {:>10} {:>10} {:>9} {:>8}  {}'.format('cluster', 'status', 'total_s', 'prepare_s',
+                                                                 'requests', 'retries', 'slowest model / error')]
+    for r in report['clusters']:
+        detail = r['error'] or ', '.join(r['failures']) or (
+            '{} ({:.1f}s)'.format(r['slowest_model'], r['model_seconds'][r['slowest_model']])
+            if r['slowest_model'] else '')
+        lines.append('{:<40} {:>8} {:>10.1f} {:>10.1f} {:>9} {:>8}  {}'.format(
+            r['cluster'], r['status'], r['seconds'], r['prepare_seconds'] or 0.0, r.get('requests', 0),
+            r.get('retries', 0), detail))
+    lines.append('{:<40} {:>10} {:>10} {:>10}'.format('latency (ok clusters)', 'p50_s', 'p95_s', 'max_s'))
+    for name in ('cluster_seconds', 'prepare_seconds', 'model_seconds'):
+        s = report[name]
+        lines.append('{:<40} {:>10.1f} {:>10.1f} {:>10.1f}'.format(name, s['p50'], s['p95'], s['max']))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deploy the car insurance models to several CDSW clusters.')
+    parser.add_argument('clusters', help='file with one public IP or base URL per line, optionally a password file')
+    parser.add_argument('resource_dir')
+    parser.add_argument('password_file', help='password file of the clusters that do not list their own')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help='clusters deployed at the same time')
+    parser.add_argument('--max-failures', type=int, help='start no new cluster once this many have failed')
+    parser.add_argument('--json', help='also write the report as JSON to this file')
+    parser.add_argument('--verbose', action='store_true', help='show the deploy output of every cluster')
+    args = parser.parse_args()
+
+    clusters = read_clusters(args.clusters, args.password_file)
+    print('# Deploy {} models to {} clusters, {} at a time'.format(len(MODELS), len(clusters), args.concurrency),
+          file=sys.stderr)
+    tracing.configure_from_env()
+    try:
+        results = deploy_fleet(clusters, MODELS, args.resource_dir, args.concurrency, args.max_failures,
+                               args.verbose)
+    finally:
+        tracing.flush()
+    report = fleet_report(results)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if report['failed'] or report['skipped']:
+        raise RuntimeError('Fleet deployment incomplete: {} failed, {} skipped'.format(report['failed'],
+                                                                                     report['skipped']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Checkpoints of the deployment phases, per CDSW cluster.
+
+Every phase that completes is recorded with its result ids under the cluster
+API URL and a scope: 'site' for the cluster-wide phases of ``prepare()``, the
+model name for the phases of ``deploy_model()``. A rerun after a partial
+failure skips the completed phases, reusing their ids, and resumes at the
+first incomplete one:
+
+    {<cluster api>: {'site': {'phases': ['create_user', ...], 'user_id': 1, 'engine_id': 2, ...},
+                     <model name>: {'phases': [...], 'project_id': 3, 'job_id': 4, ...}}}
+
+Uploaded artifacts have their own record in ``artifact_digests``. Deleting
+the state file makes the next run start from scratch.
+"""
+
+import threading
+
+import local_state
+
+
+class DeployState(object):
+
+    def __init__(self, path=None):
+        self.path = path or local_state.state_path('deployments.json')
+        self._lock = threading.Lock()
+        self._entries = local_state.read_json(self.path, {})
+
+    def get(self, cluster, scope):
+        with self._lock:
+            return dict(self._entries.get(cluster, {}).get(scope, {}))
+
+    def update(self, cluster, scope, phase=None, **results):
+        """Records ``results`` in ``scope`` and, if given, ``phase`` as completed."""
+        with self._lock:
+            entry = self._entries.setdefault(cluster, {}).setdefault(scope, {'phases': []})
+            entry.update(results)
+            if phase and phase not in entry['phases']:
+                entry['phases'] = entry['phases'] + [phase]
+            local_state.write_json(self.path, self._entries)
+
+    def forget(self, cluster, scope, phases=None):
+        """Marks ``phases`` (all the phases and results of ``scope`` if None) as not completed."""
+        with self._lock:
+            entry = self._entries.get(cluster, {}).get(scope)
+            if entry is None:
+                return
+            if phases is None:
+                del self._entries[cluster][scope]
+            else:
+                entry['phases'] = [p for p in entry['phases'] if p not in phases]
+            local_state.write_json(self.path, self._entries)
+
+
+class Checkpoints(object):
+    """Checkpoints of one scope of one cluster."""
+
+    def __init__(self, state, cluster, scope):
+        self.state = state
+        self.cluster = cluster
+        self.scope = scope
+
+    def get(self, key, default=None):
+        return self.state.get(self.cluster, self.scope).get(key, default)
+
+    def done(self, phase):
+        return phase in self.get('phases', [])
+
+    def record(self, **results):
+        self.state.update(self.cluster, self.scope, **results)
+
+    def complete(self, phase, **results):
+        self.state.update(self.cluster, self.scope, phase, **results)
+
+    def forget(self, *phases):
+        self.state.forget(self.cluster, self.scope, phases or None)
@@ -0,0 +1,622 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Local stand-in for the CDSW endpoints used by the deploy engine.
+
+Serves the v1 API (users, authentication, site stats/config, engine
+profiles, runtimes, projects, flow uploads, project files, jobs, engine
+images), the altus-ds-1 model endpoints and the model service from
+in-memory state. Jobs, model builds and deployments move through their
+states on a timer, each deployed replica serves one model call at a time, and
+every request can be delayed or failed at random, so deploy throughput and
+concurrency can be measured without a cluster:
+
+    python fake_cdsw.py --port 8080 --latency 0.05 --build-seconds 5 &
+    python deploy_all_cdsw_setup.py http://127.0.0.1:8080 /tmp/resource
+
+GET /__stats returns per-endpoint request counts and uploaded bytes.
+"""
+
+import argparse
+import email
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+_RUNTIMES = [
+    {'id': 1, 'editor': 'Workbench', 'kernel': 'Python 3.7', 'edition': 'Standard', 'shortVersion': '2022.04'},
+    {'id': 2, 'editor': 'Workbench', 'kernel': 'Python 3.8', 'edition': 'Standard', 'shortVersion': '2022.04'},
+    {'id': 3, 'editor': 'JupyterLab', 'kernel': 'Python 3.8', 'edition': 'Standard', 'shortVersion': '2022.04'},
+]
+
+
+# requirements.txt of the projects created from GitHub
+_REQUIREMENTS = b'tensorflow==2.8.0\nPillow\nnumpy\n'
+# Contents of the project files up to this size are kept, and served back by GET
+_KEPT_FILE_SIZE = 1048576
+
+
+class FakeCdswConfig(object):
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, startup_seconds=0.0, runtimes_delay=0.0,
+                 job_seconds=1.0, build_seconds=2.0, deploy_seconds=1.0, model_seconds=0.05, release='1.10.0',
+                 password=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.startup_seconds = startup_seconds
+        self.runtimes_delay = runtimes_delay
+        self.job_seconds = job_seconds
+        self.build_seconds = build_seconds
+        self.deploy_seconds = deploy_seconds
+        self.model_seconds = model_seconds
+        self.release = release
+        self.password = password
+
+
+def _phase(started, steps):
+    """Returns the status reached ``time.time() - started`` seconds after ``started``.
+
+    ``steps`` is a list of (seconds, status) pairs with increasing seconds.
+    """
+    elapsed = time.time() - started
+    status = steps[0][1]
+    for seconds, name in steps:
+        if elapsed >= seconds:
+            status = name
+    return status
+
+
+class FakeCdswState(object):
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.ids = itertools.count(100)
+        self.users = {}
+        self.token = None
+        self.site_config = {'environment': '{}', 'allow_unauthenticated_access_to_app': False}
+        self.engine_profiles = []
+        self.projects = []
+        self.uploads = {}
+        self.files = {}
+        self.jobs = {}
+        self.models = []
+        self.builds = {}
+        self.replicas = {}
+        self.requests = {}
+        self.bytes_received = 0
+
+    def count(self, key, size):
+        with self.lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.bytes_received += size
+
+    def next_id(self):
+        return next(self.ids)
+
+    def stats(self):
+        with self.lock:
+            return {'requests': dict(self.requests), 'total_requests': sum(self.requests.values()),
+                    'bytes_received': self.bytes_received, 'projects': len(self.projects),
+                    'models': len(self.models)}
+
+    # Timed state transitions
+
+    def job_status(self, job):
+        if not job.get('started'):
+            return 'scheduled'
+        seconds = self.config.job_seconds
+        return _phase(job['started'], [(0, 'scheduling'), (seconds / 3.0, 'running'), (seconds, 'succeeded')])
+
+    def build_status(self, build):
+        seconds = self.config.build_seconds
+        return _phase(build['created'], [(0, 'pending'), (seconds / 4.0, 'building'), (seconds, 'built')])
+
+    def deployment_status(self, model):
+        deployment = model['deployment']
+        if deployment is None:
+            return 'pending'
+        if deployment.get('stopped'):
+            return 'stopped'
+        build = self.builds[deployment['buildId']]
+        if self.build_status(build) != 'built':
+            return 'pending'
+        ready_at = max(deployment['created'], build['created'] + self.config.build_seconds)
+        return _phase(ready_at, [(0, 'deploying'), (self.config.deploy_seconds, 'deployed')])
+
+    def model_view(self, model):
+        build = self.builds[model['builds'][-1]]
+        view = dict((k, v) for k, v in model.items() if k not in ('builds', 'deployment'))
+        view['latestModelBuild'] = {'id': build['id'], 'status': self.build_status(build),
+                                    'comment': build.get('comment', '')}
+        deployment = model['deployment'] or {}
+        view['latestModelDeployment'] = {'id': deployment.get('id'), 'buildId': deployment.get('buildId'),
+                                         'status': self.deployment_status(model),
+                                         'cpuMillicores': deployment.get('cpuMillicores'),
+                                         'memoryMb': deployment.get('memoryMb'),
+                                         'replicationPolicy': deployment.get('replicationPolicy')}
+        return view
+
+
+def _parse_multipart(content_type, body):
+    msg = email.message_from_bytes(b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+    fields = {}
+    files = {}
+    for part in msg.get_payload():
+        name = part.get_param('name', header='content-disposition')
+        payload = part.get_payload(decode=True) or b''
+        if part.get_filename() is not None:
+            files[name] = (part.get_filename(), payload)
+        else:
+            fields[name] = payload.decode('utf-8')
+    return fields, files
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+    routes = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, obj=None):
+        if isinstance(obj, bytes):
+            body, content_type = obj, 'application/octet-stream'
+        else:
+            body, content_type = json.dumps(obj).encode('utf-8') if obj is not None else b'', 'application/json'
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        parts = urlsplit(self.path)
+        config = self.state.config
+        for route_method, pattern, name, handler in self.routes:
+            if route_method != method:
+                continue
+            match = pattern.match(parts.path)
+            if not match:
+                continue
+            self.state.count('{} {}'.format(method, name), len(body))
+            delay = config.latency + random.uniform(0, config.jitter)
+            if delay:
+                time.sleep(delay)
+            # Half of the injected failures happen once the request was carried out, as when a
+            # gateway times out on a request that went through
+            failure = random.random() if config.error_rate and random.random() < config.error_rate else None
+            if failure is not None and failure < 0.5:
+                return self._send(503, {'message': 'Injected failure'})
+            if name not in ('/__stats', '/users', '/authenticate') and not self._authorized():
+                return self._send(401, {'message': 'Unauthorized'})
+            request = {'query': parse_qs(parts.query), 'body': body,
+                       'content_type': self.headers.get('Content-Type', '')}
+            code, obj = handler(self.state, request, *match.groups())
+            if failure is not None:
+                return self._send(503, {'message': 'Injected failure'})
+            return self._send(code, obj)
+        self.state.count('{} <unknown>'.format(method), len(body))
+        self._send(404, {'message': 'Not found: {}'.format(parts.path)})
+
+    def _authorized(self):
+        return self.headers.get('Authorization') == 'Bearer {}'.format(self.state.token)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+
+def _json(request):
+    return json.loads(request['body'].decode('utf-8')) if request['body'] else {}
+
+
+# v1 API
+
+def _create_user(state, request):
+    if time.time() - state.started < state.config.startup_seconds:
+        return 503, {'message': 'CDSW is starting'}
+    user = _json(request)
+    with state.lock:
+        if user['username'] in state.users:
+            return 422, {'message': 'User already exists'}
+        state.users[user['username']] = {'id': state.next_id(), 'username': user['username'],
+                                         'name': user['name'], 'email': user['email'],
+                                         'password': user['password']}
+    return 201, dict((k, v) for k, v in state.users[user['username']].items() if k != 'password')
+
+
+def _authenticate(state, request):
+    login = _json(request)
+    user = state.users.get(login.get('login'))
+    password = state.config.password if state.config.password is not None else (user or {}).get('password')
+    if not user or login.get('password') != password:
+        return 401, {'message': 'Invalid credentials'}
+    with state.lock:
+        if state.token is None:
+            state.token = 'fake-token-{}'.format(state.next_id())
+    return 200, {'auth_token': state.token}
+
+
+def _list_users(state, request):
+    return 200, [dict((k, v) for k, v in u.items() if k != 'password') for u in state.users.values()]
+
+
+def _site_stats(state, request):
+    return 200, [{'key': 'config.release', 'value': state.config.release}]
+
+
+def _patch_site_config(state, request):
+    with state.lock:
+        state.site_config.update(_json(request))
+        return 200, dict(state.site_config)
+
+
+def _add_engine_profile(state, request):
+    profile = _json(request)
+    with state.lock:
+        profile['id'] = state.next_id()
+        state.engine_profiles.append(profile)
+    return 201, profile
+
+
+def _list_engine_profiles(state, request):
+    with state.lock:
+        return 200, list(state.engine_profiles)
+
+
+def _list_runtimes(state, request):
+    if time.time() - state.started < state.config.runtimes_delay:
+        return 501, {'message': 'Runtimes not available yet'}
+    return 200, {'runtimes': _RUNTIMES}
+
+
+def _list_projects(state, request):
+    with state.lock:
+        projects = list(state.projects)
+    offset = int(request['query'].get('offset', ['0'])[0])
+    limit = int(request['query'].get('limit', [str(len(projects) or 1)])[0])
+    return 200, projects[offset:offset + limit]
+
+
+def _find_project(state, name):
+    for project in state.projects:
+        if project['name'] == name:
+            return project
+    return None
+
+
+def _create_project(state, request):
+    params = _json(request)
+    with state.lock:
+        if _find_project(state, params['name']):
+            return 409, {'message': 'Project already exists'}
+        if params.get('template') == 'local' and params.get('uploadToken') not in state.uploads:
+            return 400, {'message': 'Unknown upload token'}
+        project = {'id': state.next_id(), 'name': params['name'], 'slug': params['name'].lower(),
+                   'owner': {'username': 'admin'}, 'template': params.get('template')}
+        state.projects.append(project)
+        if params.get('template') == 'git':
+            state.files[(project['name'], 'requirements.txt')] = {'size': len(_REQUIREMENTS), 'mtime': time.time(),
+                                                                  'content': _REQUIREMENTS}
+    return 201, project
+
+
+def _upload_chunk(state, request):
+    fields, files = _parse_multipart(request['content_type'], request['body'])
+    data = files['file'][1]
+    if len(data) != int(fields['flowCurrentChunkSize']):
+        return 400, {'message': 'Chunk size mismatch'}
+    with state.lock:
+        upload = state.uploads.setdefault(fields['uploadToken'], {'chunks': {}})
+        upload['chunks'][int(fields['flowChunkNumber'])] = len(data)
+    return 200, {}
+
+
+def _put_file(state, request, project_name, path):
+    with state.lock:
+        if not _find_project(state, project_name):
+            return 404, {'message': 'No such project'}
+    if request['content_type'].startswith('multipart/'):
+        _, files = _parse_multipart(request['content_type'], request['body'])
+        content = list(files.values())[0][1] if files else b''
+    else:
+        content = request['body']
+    size = len(content)
+    with state.lock:
+        state.files[(project_name, path)] = {'size': size, 'mtime': time.time()}
+        if size <= _KEPT_FILE_SIZE:
+            state.files[(project_name, path)]['content'] = content
+    return 200, {'path': path, 'size': size}
+
+
+def _list_files(state, request, project_name, path):
+    path = path.strip('/')
+    with state.lock:
+        entries = [{'name': p.rsplit('/', 1)[-1], 'size': f['size'], 'isDir': False}
+                   for (proj, p), f in state.files.items()
+                   if proj == project_name and (p.rsplit('/', 1)[0] if '/' in p else '') == path]
+        if (project_name, path) in state.files:
+            entry = state.files[(project_name, path)]
+            if 'content' in entry:
+                return 200, entry['content']
+            return 200, dict(entry, name=path.rsplit('/', 1)[-1])
+    return 200, entries
+
+
+def _unknown_runtime(params, key):
+    return key in params and params[key] not in [r['id'] for r in _RUNTIMES]
+
+
+def _create_job(state, request, project_name):
+    params = _json(request)
+    if _unknown_runtime(params, 'runtime_id'):
+        return 400, {'message': 'Unknown runtime'}
+    with state.lock:
+        if not _find_project(state, project_name):
+            return 404, {'message': 'No such project'}
+        job = {'id': state.next_id(), 'project': project_name, 'name': params['name'],
+               'script': params['script'], 'started': None}
+        state.jobs[job['id']] = job
+    return 201, {'id': job['id'], 'name': job['name'], 'script': job['script']}
+
+
+def _list_jobs(state, request, project_name):
+    with state.lock:
+        jobs = [job for job in state.jobs.values() if job['project'] == project_name]
+    return 200, [{'id': job['id'], 'name': job['name'], 'script': job['script']} for job in jobs]
+
+
+def _start_job(state, request, project_name, job_id):
+    with state.lock:
+        job = state.jobs.get(int(job_id))
+        if not job:
+            return 404, {'message': 'No such job'}
+        job['started'] = time.time()
+    return 200, {'status': 'scheduling'}
+
+
+def _get_job(state, request, project_name, job_id):
+    job = state.jobs.get(int(job_id))
+    if not job:
+        return 404, {'message': 'No such job'}
+    return 200, {'id': job['id'], 'name': job['name'], 'latest': {'status': state.job_status(job)}}
+
+
+def _engine_images(state, request, project_name):
+    return 200, {'id': 7, 'repository': 'docker.repository.cloudera.com/cdsw/engine', 'tag': '13'}
+
+
+# altus-ds-1 API
+
+def _list_models(state, request):
+    with state.lock:
+        return 200, [state.model_view(model) for model in state.models]
+
+
+def _new_build(state, model_id, params):
+    build = {'id': state.next_id(), 'modelId': model_id, 'created': time.time(),
+             'comment': params.get('comment', '')}
+    state.builds[build['id']] = build
+    return build
+
+
+def _create_model(state, request):
+    params = _json(request)
+    if _unknown_runtime(params, 'runtimeId'):
+        return 400, {'message': 'Unknown runtime'}
+    with state.lock:
+        model = dict((k, v) for k, v in params.items() if k != 'examples')
+        model['id'] = state.next_id()
+        model['accessKey'] = '{:032x}'.format(random.getrandbits(128))
+        build = _new_build(state, model['id'], params)
+        model['builds'] = [build['id']]
+        model['deployment'] = {'id': state.next_id(), 'buildId': build['id'], 'created': time.time(),
+                               'cpuMillicores': params.get('cpuMillicores'), 'memoryMb': params.get('memoryMb'),
+                               'replicationPolicy': params.get('replicationPolicy')}
+        state.models.append(model)
+        return 200, state.model_view(model)
+
+
+def _build_model(state, request):
+    params = _json(request)
+    if _unknown_runtime(params, 'runtimeId'):
+        return 400, {'message': 'Unknown runtime'}
+    with state.lock:
+        models = [m for m in state.models if m['id'] == params.get('modelId')]
+        if not models:
+            return 404, {'message': 'No such model'}
+        build = _new_build(state, models[0]['id'], params)
+        models[0]['builds'].append(build['id'])
+        return 200, {'id': build['id'], 'modelId': build['modelId'], 'status': state.build_status(build)}
+
+
+def _deploy_model(state, request):
+    params = _json(request)
+    with state.lock:
+        build = state.builds.get(params.get('modelBuildId'))
+        if not build:
+            return 404, {'message': 'No such build'}
+        model = [m for m in state.models if m['id'] == build['modelId']][0]
+        model['deployment'] = {'id': state.next_id(), 'buildId': build['id'], 'created': time.time(),
+                               'cpuMillicores': params.get('cpuMillicores'), 'memoryMb': params.get('memoryMb'),
+                               'replicationPolicy': params.get('replicationPolicy')}
+        return 200, {'id': model['deployment']['id'], 'modelBuildId': build['id']}
+
+
+def _stop_model(state, request):
+    params = _json(request)
+    with state.lock:
+        for model in state.models:
+            if model['deployment'] and model['deployment']['id'] == params.get('modelDeploymentId'):
+                model['deployment']['stopped'] = True
+                return 200, {}
+    return 404, {'message': 'No such deployment'}
+
+
+# Model service
+
+def _fake_prediction(function_name, image):
+    """Deterministic stand-in for the response of the model function to ``image``."""
+    value = int(hashlib.sha256(image.encode('utf-8')).hexdigest()[:8], 16)
+    if function_name == 'detectCarImage':
+        return {'carDetected': value % 10 != 0}
+    if function_name == 'detectIfCarIsImage':
+        return {'isDamaged': value % 3 != 0}
+    if function_name == 'detectDamageLocalization':
+        return {'localization': ['front', 'rear', 'side'][value % 3]}
+    if function_name == 'detectDamageSeverity':
+        return {'severity': ['minor', 'moderate', 'severe'][value % 3]}
+    return {}
+
+
+def _call_model(state, request):
+    params = _json(request)
+    with state.lock:
+        models = [m for m in state.models if m.get('accessKey') == params.get('accessKey')]
+        if not models:
+            return 404, {'success': False, 'message': 'No such model'}
+        model = models[0]
+        if state.deployment_status(model) != 'deployed':
+            return 503, {'success': False, 'message': 'Model is not deployed'}
+        deployment = model['deployment']
+        replicas = (deployment.get('replicationPolicy') or {}).get('numReplicas') or 1
+        if deployment['id'] not in state.replicas:
+            state.replicas[deployment['id']] = threading.BoundedSemaphore(replicas)
+        replica = state.replicas[deployment['id']]
+    function_name = model.get('targetFunctionName', '')
+    request = params.get('request') or {}
+    if function_name.endswith('Batch'):
+        # Half of a call is per-call overhead (request handling, Python dispatch), half per image
+        images = request.get('images', [])
+        with replica:
+            time.sleep(state.config.model_seconds * (1 + len(images)) / 2.0)
+        results = [_fake_prediction(function_name[:-len('Batch')], image) for image in images]
+        return 200, {'success': True, 'response': {'results': results}}
+    with replica:
+        time.sleep(state.config.model_seconds)
+    return 200, {'success': True, 'response': _fake_prediction(function_name, request.get('imageBase64', ''))}
+
+
+def _stats(state, request):
+    return 200, state.stats()
+
+
+_V1 = '/api/v1'
+_ALTUS = '/api/altus-ds-1'
+_PROJECT = _V1 + r'/projects/admin/([^/]+)'
+
+_ROUTES = [
+    ('GET', '/__stats', _stats),
+    ('POST', _V1 + '/users', _create_user),
+    ('GET', _V1 + '/users', _list_users),
+    ('POST', _V1 + '/authenticate', _authenticate),
+    ('GET', _V1 + '/site/stats', _site_stats),
+    ('PATCH', _V1 + '/site/config', _patch_site_config),
+    ('GET', _V1 + '/site/engine-profiles', _list_engine_profiles),
+    ('POST', _V1 + '/site/engine-profiles', _add_engine_profile),
+    ('GET', _V1 + '/runtimes', _list_runtimes),
+    ('GET', _V1 + '/users/admin/projects', _list_projects),
+    ('POST', _V1 + '/users/admin/projects', _create_project),
+    ('POST', _V1 + '/upload/admin', _upload_chunk),
+    ('PUT', _PROJECT + '/files/(.+)', _put_file),
+    ('GET', _PROJECT + '/files/?(.*)', _list_files),
+    ('GET', _PROJECT + '/jobs', _list_jobs),
+    ('POST', _PROJECT + '/jobs', _create_job),
+    ('POST', _PROJECT + r'/jobs/(\d+)/start', _start_job),
+    ('GET', _PROJECT + r'/jobs/(\d+)', _get_job),
+    ('GET', _PROJECT + '/engine-images', _engine_images),
+    ('POST', _ALTUS + '/models/list-models', _list_models),
+    ('POST', _ALTUS + '/models/create-model', _create_model),
+    ('POST', _ALTUS + '/models/build-model', _build_model),
+    ('POST', _ALTUS + '/models/deploy-model', _deploy_model),
+    ('POST', _ALTUS + '/models/stop-model', _stop_model),
+    ('POST', '/model', _call_model),
+]
+
+
+class FakeCdswServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(*self.server_address[:2])
+
+
+def make_server(host='127.0.0.1', port=0, config=None):
+    """Creates a server on ``host:port`` (port 0 picks a free one); call serve_forever() to run it."""
+    state = FakeCdswState(config or FakeCdswConfig())
+    routes = []
+    for method, pattern, handler in _ROUTES:
+        name = re.sub(r'\??\(.*?\)\??', '<param>', pattern)
+        routes.append((method, re.compile(pattern + '$'), name.replace(_V1, '').replace(_ALTUS, ''), handler))
+    handler_class = type('FakeCdswHandler', (_Handler,), {'state': state, 'routes': routes})
+    server = FakeCdswServer((host, port), handler_class)
+    server.state = state
+    return server
+
+
+def start_in_thread(config=None, host='127.0.0.1', port=0):
+    server = make_server(host, port, config)
+    thread = threading.Thread(target=server.serve_forever, name='fake-cdsw')
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the CDSW API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra latency, up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of requests answered with 503, half of them after carrying the request out')
+    parser.add_argument('--startup-seconds', type=float, default=0.0,
+                        help='user creation returns 503 for this long after start')
+    parser.add_argument('--runtimes-delay', type=float, default=0.0,
+                        help='/runtimes returns 501 for this long after start')
+    parser.add_argument('--job-seconds', type=float, default=1.0)
+    parser.add_argument('--build-seconds', type=float, default=2.0)
+    parser.add_argument('--deploy-seconds', type=float, default=1.0)
+    parser.add_argument('--model-seconds', type=float, default=0.05, help='time one replica takes per model call')
+    parser.add_argument('--release', default='1.10.0')
+    args = parser.parse_args()
+
+    config = FakeCdswConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                            startup_seconds=args.startup_seconds, runtimes_delay=args.runtimes_delay,
+                            job_seconds=args.job_seconds, build_seconds=args.build_seconds,
+                            deploy_seconds=args.deploy_seconds, model_seconds=args.model_seconds,
+                            release=args.release)
+    server = make_server(args.host, args.port, config)
+    print('Fake CDSW listening on {}'.format(server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
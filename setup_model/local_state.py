@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Location and JSON persistence of the deploy tooling's local state files."""
+
+import json
+import os
+import tempfile
+
+STATE_DIR = os.environ.get('CDSW_STATE_DIR', os.path.expanduser('~/.cdsw_setup'))
+
+
+def state_path(name):
+    return os.path.join(STATE_DIR, name)
+
+
+def read_json(path, default=None):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return default
+
+
+def write_json(path, data):
+    """Writes ``data`` atomically, so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+    # A temporary file of its own per writer: threads and processes may write the same path at once
+    fd, tmp = tempfile.mkstemp(dir=directory or '.', prefix='.{}.'.format(os.path.basename(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Replica autoscaling of the deployed models from their observed traffic.
+
+Observations are model calls (model name, time, latency), taken from the
+``model_call`` spans of ``model_client``: live, with the scaler attached as a
+tracing listener, or from trace files written with ``CDSW_TRACE_FILE``.
+
+Over a sliding window, the concurrency a model needs is estimated by Little's
+law (throughput x mean latency) and the replicas are sized so that each one
+runs at ``target_utilization`` of its ``replica_concurrency``. One more replica
+is added while the p95 latency is above the model's ``latency_slo``. Scaling up
+is immediate; scaling down goes one replica at a time and waits ``cooldown``
+seconds after the last change of that model. Replica counts always stay within
+the 'min_replicas'/'max_replicas' of the model profile:
+
+    python model_autoscaler.py PUBLIC_IP PWD_FILE --trace /tmp/claims-trace.jsonl --follow
+"""
+
+import argparse
+import collections
+import json
+import math
+import threading
+import time
+
+import cdsw_setup
+import tracing
+from model_manifest import MODELS
+
+WINDOW = 120
+TARGET_UTILIZATION = 0.7
+COOLDOWN = 300
+INTERVAL = 30
+
+
+class _Window(object):
+    """Model calls of the last ``seconds`` seconds."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._calls = collections.deque()
+
+    def add(self, timestamp, latency):
+        self._calls.append((timestamp, latency))
+
+    def summary(self, now):
+        while self._calls and self._calls[0][0] < now - self.seconds:
+            self._calls.popleft()
+        latencies = sorted(latency for _, latency in self._calls)
+        if not latencies:
+            return {'calls': 0, 'throughput': 0.0, 'mean_latency': 0.0, 'p95_latency': 0.0}
+        return {
+            'calls': len(latencies),
+            'throughput': len(latencies) / float(self.seconds),
+            'mean_latency': sum(latencies) / len(latencies),
+            'p95_latency': latencies[max(0, int(math.ceil(0.95 * len(latencies))) - 1)],
+        }
+
+
+def desired_replicas(resources, current, summary, target_utilization=TARGET_UTILIZATION):
+    """Replica count for a model with profile ``resources`` now running ``current`` replicas."""
+    needed = summary['throughput'] * summary['mean_latency'] / (resources['replica_concurrency'] *
+                                                                target_utilization)
+    desired = int(math.ceil(needed))
+    if resources['latency_slo'] and summary['p95_latency'] > resources['latency_slo']:
+        desired = max(desired, current + 1)
+    if desired < current:
+        desired = current - 1
+    return min(max(desired, resources['min_replicas']), resources['max_replicas'])
+
+
+class Autoscaler(object):
+
+    def __init__(self, cdsw, models, window=WINDOW, target_utilization=TARGET_UTILIZATION, cooldown=COOLDOWN):
+        self.cdsw = cdsw
+        self.models = dict((spec['name'], spec) for spec in models)
+        self.target_utilization = target_utilization
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._windows = dict((name, _Window(window)) for name in self.models)
+        self._last_change = {}
+        self.last_observed = None
+
+    def observe(self, name, latency, timestamp=None):
+        if name not in self._windows:
+            return
+        timestamp = timestamp or time.time()
+        with self._lock:
+            self._windows[name].add(timestamp, latency)
+            self.last_observed = max(self.last_observed or 0, timestamp)
+
+    def on_span(self, span):
+        """Tracing listener; see ``attach()``."""
+        if span.name == 'model_call':
+            self.observe(span.attributes.get('model'), span.duration, span.end)
+
+    def observe_trace_line(self, line):
+        """Observes the ``model_call`` span of one line of a JSON lines trace file, if it is one."""
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return
+        if record.get('name') == 'model_call' and record.get('end'):
+            self.observe(record['attributes'].get('model'), record['duration'], record['end'])
+
+    def attach(self):
+        """Observes the model calls of this process; returns a function detaching the scaler."""
+        return tracing.add_listener(self.on_span)
+
+    def plan(self, now=None):
+        """List of (spec, current replicas, desired replicas, traffic summary) of the models to rescale."""
+        now = now or time.time()
+        changes = []
+        for name, spec in self.models.items():
+            model = self.cdsw.get_model(name)
+            if not model:
+                continue
+            resources = cdsw_setup.model_resources(spec)
+            current = cdsw_setup.deployed_replicas(model) or resources['replicas']
+            with self._lock:
+                summary = self._windows[name].summary(now)
+            desired = desired_replicas(resources, current, summary, self.target_utilization)
+            if desired < current and now - self._last_change.get(name, 0) < self.cooldown:
+                continue
+            if desired != current:
+                changes.append((spec, current, desired, summary))
+        return changes
+
+    def apply(self, now=None, dry_run=False):
+        changes = self.plan(now)
+        for spec, current, desired, summary in changes:
+            print('[{}] {} calls, {:.2f}/s, mean {:.3f}s, p95 {:.3f}s: {} -> {} replicas'.format(
+                spec['name'], summary['calls'], summary['throughput'], summary['mean_latency'],
+                summary['p95_latency'], current, desired))
+            if not dry_run:
+                cdsw_setup.scale_model(self.cdsw, spec, desired)
+                self._last_change[spec['name']] = now or time.time()
+        return changes
+
+
+def _read_new_lines(paths, offsets):
+    for path in paths:
+        try:
+            with open(path) as f:
+                f.seek(offsets.get(path, 0))
+                while True:
+                    line = f.readline()
+                    if not line.endswith('\n'):
+                        break
+                    offsets[path] = f.tell()
+                    yield line
+        except IOError:
+            continue
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scale the model replicas from the observed model calls.')
+    parser.add_argument('public_ip')
+    parser.add_argument('pwd_file')
+    parser.add_argument('--trace', action='append', required=True,
+                        help='JSON lines trace file with model_call spans (repeatable)')
+    parser.add_argument('--follow', action='store_true', help='keep reading the trace files and rescaling')
+    parser.add_argument('--interval', type=float, default=INTERVAL)
+    parser.add_argument('--window', type=float, default=WINDOW)
+    parser.add_argument('--target-utilization', type=float, default=TARGET_UTILIZATION)
+    parser.add_argument('--cooldown', type=float, default=COOLDOWN)
+    parser.add_argument('--dry-run', action='store_true', help='only print the planned changes')
+    args = parser.parse_args()
+
+    cdsw = cdsw_setup.Cdsw(args.public_ip, open(args.pwd_file).read())
+    cdsw.init_session()
+    cdsw.authorize()
+    models = MODELS + [cdsw_setup.batch_spec(spec) for spec in MODELS if spec.get('batch')]
+    scaler = Autoscaler(cdsw, models, args.window, args.target_utilization, args.cooldown)
+    offsets = {}
+    while True:
+        for line in _read_new_lines(args.trace, offsets):
+            scaler.observe_trace_line(line)
+        if not args.follow:
+            # A one-shot run judges the traffic at the end of the trace, not now
+            scaler.apply(scaler.last_observed, dry_run=args.dry_run)
+            break
+        scaler.apply(dry_run=args.dry_run)
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
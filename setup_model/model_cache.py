@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Shared cache of the list-models response, indexed by model name and id.
+
+All deployments of a run poll model state through one cache: whichever
+caller first finds the snapshot older than the TTL refreshes it with a
+single list-models call, and concurrent callers wait for and reuse that
+result, so the number of list calls per polling tick does not grow with the
+number of models being watched.
+"""
+
+import threading
+import time
+
+MODEL_CACHE_TTL = 5.0
+
+
+class ModelCache(object):
+
+    def __init__(self, fetch, ttl=MODEL_CACHE_TTL):
+        self._fetch = fetch
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_name = {}
+        self._by_id = {}
+        self._fetched_at = None
+        self.refreshes = 0
+
+    def _refresh_locked(self):
+        models = self._fetch()
+        self._by_name = {}
+        for model in models:
+            # list-models may return several models with the same name; keep the first one as before
+            self._by_name.setdefault(model['name'], model)
+        self._by_id = dict((model['id'], model) for model in models)
+        self._fetched_at = time.time()
+        self.refreshes += 1
+
+    def _ensure_fresh(self, max_age):
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            if self._fetched_at is None or time.time() - self._fetched_at >= max_age:
+                self._refresh_locked()
+
+    def get(self, name, max_age=None):
+        self._ensure_fresh(max_age)
+        return self._by_name.get(name, {})
+
+    def get_by_id(self, model_id, max_age=None):
+        self._ensure_fresh(max_age)
+        return self._by_id.get(model_id, {})
+
+    def invalidate(self):
+        with self._lock:
+            self._fetched_at = None
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Client of the deployed model endpoints.
+
+CDSW serves every model at the model service URL: a call posts the model's
+access key and the request, and gets back ``{'success': ..., 'response': ...}``.
+Every call is recorded as a ``model_call`` span carrying the model name, which
+is what ``model_autoscaler`` sizes the replicas from.
+
+Models deployed with 'batch' also have a batch variant taking a list of images
+(see ``cdsw_setup.batch_spec``); ``predict_many()`` splits a backlog of images
+into batches and sends several batches at a time.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import cdsw_setup
+import tracing
+
+BATCH_SIZE = 16
+BATCH_WORKERS = 4
+
+
+class ModelClient(object):
+
+    def __init__(self, cdsw):
+        self.cdsw = cdsw
+
+    def access_key(self, name):
+        model = self.cdsw.get_model(name)
+        if not model:
+            raise RuntimeError('Model {} not found'.format(name))
+        return model['accessKey']
+
+    def predict(self, name, request, **attributes):
+        """Response of model ``name`` to ``request`` (the dict passed to the model function)."""
+        access_key = self.access_key(name)
+        with tracing.span('model_call', model=name, **attributes):
+            resp = self.cdsw.post(self.cdsw.model_service, idempotent=True,
+                                  json={'accessKey': access_key, 'request': request})
+        result = resp.json()
+        if not result.get('success', False):
+            raise RuntimeError('Model {} failed: {}'.format(name, result))
+        return result['response']
+
+    def predict_batch(self, spec, images):
+        """Results of the batch variant of the model of ``spec`` for ``images``, in the same order.
+
+        A result is the response of the model function for that image, or
+        ``{'error': message}`` if the function raised for it.
+        """
+        name = cdsw_setup.batch_spec(spec)['name']
+        results = self.predict(name, {'images': list(images)}, batch_size=len(images))['results']
+        if len(results) != len(images):
+            raise RuntimeError('Model {} returned {} results for {} images'.format(name, len(results), len(images)))
+        return results
+
+    def predict_many(self, spec, images, batch_size=BATCH_SIZE, workers=BATCH_WORKERS):
+        """Results for a backlog of ``images``, sent in batches of ``batch_size``, ``workers`` at a time."""
+        images = list(images)
+        batches = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return [result for results in executor.map(lambda batch: self.predict_batch(spec, batch), batches)
+                    for result in results]
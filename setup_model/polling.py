@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Polling with adaptive backoff for the long-running CDSW operations.
+
+``wait_for()`` repeatedly calls a check function. The delay between calls
+starts small, grows geometrically while the observed state stays the same and
+drops back to the initial delay as soon as the state changes, so a transition
+is noticed quickly without hammering the API during long builds.
+"""
+
+import random
+import threading
+import time
+
+import tracing
+
+_STATS_LOCK = threading.Lock()
+_STATS = {'waits': 0, 'polls': 0, 'idle_seconds': 0.0}
+
+
+def _record(waits=0, polls=0, idle=0.0):
+    with _STATS_LOCK:
+        _STATS['waits'] += waits
+        _STATS['polls'] += polls
+        _STATS['idle_seconds'] += idle
+
+
+def stats():
+    """Totals since the last reset: completed waits, check calls and seconds spent sleeping."""
+    with _STATS_LOCK:
+        return dict(_STATS)
+
+
+def reset_stats():
+    with _STATS_LOCK:
+        _STATS.update({'waits': 0, 'polls': 0, 'idle_seconds': 0.0})
+
+
+class WaitTimeout(RuntimeError):
+    pass
+
+
+class Pending(object):
+    """Returned by a check function to keep waiting; ``state`` is what it observed."""
+
+    def __init__(self, state=None):
+        self.state = state
+
+
+def wait_for(check, description, deadline=600, initial_delay=1.0, max_delay=30.0, factor=1.6, jitter=0.2):
+    """Calls ``check()`` until it returns something other than a ``Pending``.
+
+    ``check`` raises to abort on a terminal failure state. Raises ``WaitTimeout``
+    if ``deadline`` seconds pass first (``None`` waits forever). Returns the
+    value returned by ``check``. The wait is recorded as a ``wait`` span.
+    """
+    with tracing.span('wait', description=description) as waiting:
+        return _wait(check, description, deadline, initial_delay, max_delay, factor, jitter, waiting)
+
+
+def _wait(check, description, deadline, initial_delay, max_delay, factor, jitter, waiting):
+    start = time.time()
+    delay = initial_delay
+    last_state = None
+    attempts = 0
+    while True:
+        attempts += 1
+        result = check()
+        _record(polls=1)
+        waiting.set(polls=attempts)
+        if not isinstance(result, Pending):
+            _record(waits=1)
+            return result
+        if result.state != last_state:
+            delay = initial_delay
+            last_state = result.state
+        else:
+            delay = min(delay * factor, max_delay)
+        sleep = delay * random.uniform(1 - jitter, 1 + jitter)
+        if deadline is not None:
+            remaining = start + deadline - time.time()
+            if remaining <= 0:
+                raise WaitTimeout('Timed out after {:.0f}s and {} attempts waiting for {} (last state: {})'.format(
+                    time.time() - start, attempts, description, last_state))
+            sleep = min(sleep, remaining)
+        _record(idle=sleep)
+        waiting.set(idle_seconds=waiting.attributes.get('idle_seconds', 0.0) + sleep)
+        time.sleep(sleep)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Catalog of the admin user's projects, indexed by name and id.
+
+The project list is fetched page by page once per run and shared by all
+model deployments. Projects created during the run are added incrementally,
+so lookups after a create do not re-download the whole list. ``add_page()``
+is the paging step, shared with the asyncio client (``cdsw_async``).
+"""
+
+import threading
+
+PAGE_SIZE = 100
+
+
+def add_page(by_name, by_id, page, page_size):
+    """Indexes the projects of ``page`` by name and id; returns True if there may be another page."""
+    new = [proj for proj in page if proj['id'] not in by_id]
+    for proj in new:
+        by_name.setdefault(proj['name'], proj)
+        by_id[proj['id']] = proj
+    # A short page is the last one; a server that ignores paging returns everything at once
+    return len(page) == page_size and bool(new)
+
+
+class ProjectCatalog(object):
+
+    def __init__(self, fetch_page, page_size=PAGE_SIZE):
+        """``fetch_page(limit, offset)`` returns one page of the project list."""
+        self._fetch_page = fetch_page
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._by_name = None
+        self._by_id = None
+
+    def _load_locked(self):
+        by_name = {}
+        by_id = {}
+        offset = 0
+        while True:
+            page = self._fetch_page(self.page_size, offset)
+            if not add_page(by_name, by_id, page, self.page_size):
+                break
+            offset += len(page)
+        self._by_name = by_name
+        self._by_id = by_id
+
+    def _loaded_locked(self):
+        if self._by_name is None:
+            self._load_locked()
+        return self._by_name, self._by_id
+
+    def get(self, name=None, project_id=None):
+        if (not name and not project_id) or (name and project_id):
+            raise RuntimeError("Must specify either name or id, but not both.")
+        # Local references: a concurrent invalidate() only drops the attributes
+        with self._lock:
+            by_name, by_id = self._loaded_locked()
+        if name:
+            return by_name.get(name, {})
+        return by_id.get(project_id, {})
+
+    def add(self, project):
+        with self._lock:
+            by_name, by_id = self._loaded_locked()
+            by_name[project['name']] = project
+            by_id[project['id']] = project
+
+    def invalidate(self):
+        with self._lock:
+            self._by_name = None
+            self._by_id = None
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""On-disk cache of runtime ids per CDSW cluster and release.
+
+Runtime ids are indexed by ``(editor, kernel, edition, shortVersion)``, so a
+repeated deploy resolves its runtime without downloading the full
+/runtimes listing. Entries are keyed by the cluster API URL and the CDSW
+release, which makes an upgrade of the cluster start from a fresh listing.
+"""
+
+import threading
+import time
+
+import local_state
+
+RUNTIME_CACHE_MAX_AGE = 7 * 24 * 3600
+
+
+def runtime_key(editor, kernel, edition, short_version):
+    return '|'.join([editor, kernel, edition, short_version])
+
+
+class RuntimeCatalog(object):
+
+    def __init__(self, path=None, max_age=RUNTIME_CACHE_MAX_AGE):
+        self.path = path or local_state.state_path('runtimes.json')
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = local_state.read_json(self.path, {})
+
+    @staticmethod
+    def _cluster_key(cluster, release):
+        return '{}|{}'.format(cluster, '.'.join(str(v) for v in release))
+
+    def lookup(self, cluster, release, editor, kernel, edition, short_version):
+        with self._lock:
+            entry = self._entries.get(self._cluster_key(cluster, release))
+        if not entry or time.time() - entry['fetched_at'] > self.max_age:
+            return None
+        return entry['index'].get(runtime_key(editor, kernel, edition, short_version))
+
+    def store(self, cluster, release, runtimes):
+        index = {}
+        for runtime in runtimes:
+            key = runtime_key(runtime['editor'], runtime['kernel'], runtime['edition'], runtime['shortVersion'])
+            index.setdefault(key, runtime['id'])
+        with self._lock:
+            self._entries[self._cluster_key(cluster, release)] = {'fetched_at': time.time(), 'index': index}
+            local_state.write_json(self.path, self._entries)
+        return index
+
+    def forget(self, cluster, release):
+        with self._lock:
+            if self._entries.pop(self._cluster_key(cluster, release), None) is not None:
+                local_state.write_json(self.path, self._entries)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Destinations for rows written to the car_insurance tables.
+
+A sink takes rows (dicts of column -> value) through ``write(rows)`` and is
+closed with ``close()``, which writes anything still buffered:
+
+* ``JsonLinesSink`` appends the rows to a local JSON lines file, a stand-in
+  for the tables when there is no cluster;
+* ``ImpalaShellSink`` runs the rows through ``impala-shell``, like
+  ``deploy_data.sh`` does, one invocation per batch: as ``UPDATE`` statements
+  of some columns of existing rows, or as one multi-row ``UPSERT`` or
+  ``INSERT`` (Kudu skips the inserted rows whose key already exists).
+"""
+
+import datetime
+import decimal
+import json
+import os
+import subprocess
+import tempfile
+import threading
+
+IMPALA_SHELL = 'impala-shell'
+BATCH_ROWS = 200
+
+
+class JsonLinesSink(object):
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a')
+
+    def write(self, rows):
+        with self._lock:
+            for row in rows:
+                self._file.write(json.dumps(row, sort_keys=True, default=str) + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def sql_literal(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return "CAST('{}' AS TIMESTAMP)".format(value.strftime('%Y-%m-%d %H:%M:%S'))
+    return "'{}'".format(str(value).replace('\\', '\\\\').replace("'", "\\'"))
+
+
+class ImpalaShellSink(object):
+    """Writes rows to ``table`` through impala-shell.
+
+    With ``mode='update'`` each row updates its columns in the row matching its
+    ``key`` column; with ``mode='upsert'`` (or ``mode='insert'``, which leaves
+    existing rows untouched) each batch is a single ``UPSERT`` (``INSERT``) of
+    ``columns`` (default: the columns of the first row).
+    """
+
+    def __init__(self, table, key, impala_host=None, batch_rows=BATCH_ROWS, impala_shell=IMPALA_SHELL,
+                 mode='update', columns=None):
+        if mode not in ('update', 'upsert', 'insert'):
+            raise RuntimeError('Unknown sink mode: {}'.format(mode))
+        self.table = table
+        self.key = key
+        self.impala_host = impala_host
+        self.batch_rows = batch_rows
+        self.impala_shell = impala_shell
+        self.mode = mode
+        self.columns = columns
+        self._lock = threading.Lock()
+        self._buffer = []
+
+    def _update(self, row):
+        assignments = ', '.join('{} = {}'.format(column, sql_literal(value))
+                                for column, value in sorted(row.items()) if column != self.key)
+        return 'UPDATE {} SET {} WHERE {} = {}'.format(self.table, assignments, self.key, sql_literal(row[self.key]))
+
+    def _write_rows(self, rows):
+        columns = self.columns or sorted(rows[0])
+        values = ',\n'.join('({})'.format(', '.join(sql_literal(row[column]) for column in columns)) for row in rows)
+        return '{} INTO {} ({}) VALUES\n{}'.format(self.mode.upper(), self.table, ', '.join(columns), values)
+
+    def _run(self, rows):
+        if self.mode in ('upsert', 'insert'):
+            statements = [self._write_rows(rows)]
+        else:
+            statements = [self._update(row) for row in rows]
+        # Through a file: a batch easily exceeds the size limit of a command line argument
+        fd, path = tempfile.mkstemp(prefix='impala-sink-', suffix='.sql')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(';\n'.join(statements) + ';\n')
+            command = [self.impala_shell, '-B', '-f', path]
+            if self.impala_host:
+                command[1:1] = ['-i', self.impala_host]
+            subprocess.check_call(command, stdout=subprocess.DEVNULL)
+        finally:
+            os.remove(path)
+
+    def write(self, rows):
+        with self._lock:
+            self._buffer.extend(rows)
+            if len(self._buffer) < self.batch_rows:
+                return
+            batch, self._buffer = self._buffer, []
+        self._run(batch)
+
+    def close(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._run(batch)
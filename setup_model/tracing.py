@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""Spans for the deploy phases and the CDSW REST calls.
+
+Every deploy phase and every ``cdsw_transport.rest_call`` runs inside a span
+recording its duration, outcome and attributes (HTTP status, payload sizes,
+retry count, model name, ...). Spans nest per thread (``bind()`` carries the
+current span over to a worker thread). Finished spans go to
+the registered listeners and, if configured, to an export file:
+
+* ``jsonl``: one JSON object per span, written as soon as the span ends;
+* ``otlp``: an OpenTelemetry OTLP/JSON ``resourceSpans`` document written by
+  ``flush()``, loadable by OTLP-compatible tooling.
+
+Set ``CDSW_TRACE_FILE`` (and optionally ``CDSW_TRACE_FORMAT``) to enable the
+export from the command line tools.
+"""
+
+import functools
+import json
+import os
+import random
+import threading
+import time
+
+_LOCAL = threading.local()
+_LOCK = threading.Lock()
+_LISTENERS = []
+_EXPORT = {'path': None, 'format': 'jsonl', 'buffer': []}
+_TRACE = {'id': None}
+
+SERVICE_NAME = 'cdsw-car-insurance-deploy'
+
+
+def _new_id(bits):
+    return '{:0{}x}'.format(random.getrandbits(bits), bits // 4)
+
+
+def new_trace():
+    """Starts a new trace id for the spans that have no parent."""
+    _TRACE['id'] = _new_id(128)
+    return _TRACE['id']
+
+
+class Span(object):
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else (_TRACE['id'] or new_trace())
+        self.span_id = _new_id(64)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.end = None
+        self.error = None
+
+    @property
+    def duration(self):
+        return (self.end or time.time()) - self.start
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'end': self.end,
+            'duration': self.duration,
+            'status': 'error' if self.error else 'ok',
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+
+def _stack():
+    if not hasattr(_LOCAL, 'stack'):
+        _LOCAL.stack = []
+    return _LOCAL.stack
+
+
+def current_span():
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+class span(object):
+    """Context manager running its block inside a new child span of the current one."""
+
+    def __init__(self, name, **attributes):
+        self.span = Span(name, current_span(), attributes)
+
+    def __enter__(self):
+        _stack().append(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _stack().pop()
+        self.span.end = time.time()
+        if exc is not None:
+            self.span.error = '{}: {}'.format(exc_type.__name__, exc)
+        _finish(self.span)
+        return False
+
+
+def record(name, start, error=None, **attributes):
+    """Records a span from ``start`` to now outside of the span stack, e.g. for a coroutine."""
+    finished = Span(name, None, attributes)
+    finished.start = start
+    finished.end = time.time()
+    finished.error = error
+    _finish(finished)
+    return finished
+
+
+def traced(name):
+    """Decorator running the function inside a span called ``name``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind(func):
+    """``func`` running its spans under the current span of the caller, e.g. in a worker thread."""
+    parent = current_span()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stack = _stack()
+        depth = len(stack)
+        if parent is not None:
+            stack.append(parent)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            del stack[depth:]
+    return wrapper
+
+
+def add_listener(listener):
+    """Calls ``listener(span)`` for every finished span; returns a function removing it."""
+    with _LOCK:
+        _LISTENERS.append(listener)
+
+    def remove():
+        with _LOCK:
+            if listener in _LISTENERS:
+                _LISTENERS.remove(listener)
+    return remove
+
+
+def configure(path=None, fmt='jsonl'):
+    if fmt not in ('jsonl', 'otlp'):
+        raise RuntimeError('Unknown trace format: {}'.format(fmt))
+    with _LOCK:
+        _EXPORT.update({'path': path, 'format': fmt, 'buffer': []})
+
+
+def configure_from_env():
+    path = os.environ.get('CDSW_TRACE_FILE')
+    if path:
+        configure(path, os.environ.get('CDSW_TRACE_FORMAT', 'jsonl'))
+
+
+def _finish(finished):
+    with _LOCK:
+        listeners = list(_LISTENERS)
+        if _EXPORT['path']:
+            if _EXPORT['format'] == 'jsonl':
+                with open(_EXPORT['path'], 'a') as f:
+                    f.write(json.dumps(finished.to_dict(), sort_keys=True) + '\n')
+            else:
+                _EXPORT['buffer'].append(finished)
+    for listener in listeners:
+        listener(finished)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(spans):
+    """OTLP/JSON document for ``spans``."""
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+        'scopeSpans': [{
+            'scope': {'name': 'cdsw_setup'},
+            'spans': [{
+                'traceId': s.trace_id,
+                'spanId': s.span_id,
+                'parentSpanId': s.parent_id or '',
+                'name': s.name,
+                'kind': 3 if s.name == 'http' else 1,
+                'startTimeUnixNano': str(int(s.start * 1e9)),
+                'endTimeUnixNano': str(int(s.end * 1e9)),
+                'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in sorted(s.attributes.items())],
+                'status': {'code': 2, 'message': s.error} if s.error else {'code': 1},
+            } for s in spans],
+        }],
+    }]}
+
+
+def flush():
+    """Writes the buffered spans of the ``otlp`` export."""
+    with _LOCK:
+        if not _EXPORT['path'] or _EXPORT['format'] != 'otlp' or not _EXPORT['buffer']:
+            return
+        spans, _EXPORT['buffer'] = _EXPORT['buffer'], []
+        with open(_EXPORT['path'], 'w') as f:
+            json.dump(to_otlp(spans), f)